@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""Artist collaboration graph backed by a sparse co-occurrence matrix.
+
+Section 10 of spotify_2023_analysis.py builds a Python list of artist tuples
+per track and counts them with ``value_counts``. ``CollaborationGraph``
+instead splits each distinct ``artist(s)_name`` string once, interns every
+artist name to an integer id, generates all artist pairs with NumPy (credits
+are grouped by artist count and each group is expanded with one
+``triu_indices`` gather) and accumulates the counts, weighted by how many
+tracks share the credit string, in a symmetric ``scipy.sparse`` matrix::
+
+    graph = CollaborationGraph.from_tracks(spotify_data['artist(s)_name'])
+    graph.top_pairs(10)
+    graph.collaborators('Bad Bunny')
+
+Tracks can be added in batches; new artists extend the vocabulary. Unlike
+the notebook, an artist listed twice on one track and empty names are not
+counted as pairs.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+class CollaborationGraph:
+    """Pair counts of artists that appear on the same track."""
+
+    def __init__(self, separator=', '):
+        self.separator = separator
+        self.ids = {}
+        self.names = []
+        self.counts = sparse.csr_matrix((0, 0), dtype=np.int64)
+        self.tracks = 0
+
+    @classmethod
+    def from_tracks(cls, artists, separator=', '):
+        graph = cls(separator)
+        graph.add_tracks(artists)
+        return graph
+
+    @property
+    def n_artists(self):
+        return len(self.names)
+
+    def _intern(self, names):
+        """Map an array of names to ids, assigning new ids to unseen names.
+
+        Only distinct names are looked up in the dictionary; rows are mapped
+        with one ``take``.
+        """
+        codes, uniques = pd.factorize(names)
+        lookup = np.empty(len(uniques), dtype=np.int64)
+        for i, name in enumerate(uniques):
+            id_ = self.ids.get(name)
+            if id_ is None:
+                id_ = self.ids[name] = len(self.names)
+                self.names.append(name)
+            lookup[i] = id_
+        return lookup[codes]
+
+    def add_tracks(self, artists):
+        """Add the pairs of a batch of ``artist(s)_name`` strings."""
+        artists = pd.Series(artists).dropna()
+        self.tracks += len(artists)
+        credits, uniques = pd.factorize(artists)
+        multiplicity = np.bincount(credits, minlength=len(uniques))
+        exploded = pd.Series(uniques).str.split(self.separator, regex=False).explode()
+        exploded = exploded[exploded.str.len() > 0]
+        rows = exploded.index.to_numpy()
+        ids = self._intern(exploded.to_numpy())
+
+        # Drop repeated artists within a track, then sort ids inside each track
+        order = np.lexsort((ids, rows))
+        rows, ids = rows[order], ids[order]
+        keep = np.ones(len(ids), dtype=bool)
+        keep[1:] = (rows[1:] != rows[:-1]) | (ids[1:] != ids[:-1])
+        rows, ids = rows[keep], ids[keep]
+
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        sizes = np.diff(np.r_[starts, len(rows)])
+        left, right, weight = [], [], []
+        for size in np.unique(sizes[sizes > 1]):
+            first = starts[sizes == size]
+            block = ids[first[:, None] + np.arange(size)]
+            i, j = np.triu_indices(size, 1)
+            left.append(block[:, i].ravel())
+            right.append(block[:, j].ravel())
+            weight.append(np.repeat(multiplicity[rows[first]], len(i)))
+
+        n = self.n_artists
+        counts = self.counts
+        counts.resize((n, n))
+        if left:
+            left, right, weight = np.concatenate(left), np.concatenate(right), np.concatenate(weight)
+            batch = sparse.coo_matrix((np.r_[weight, weight], (np.r_[left, right], np.r_[right, left])),
+                                      shape=(n, n), dtype=np.int64).tocsr()
+            counts = counts + batch
+        self.counts = counts.tocsr()
+        return self
+
+    def pair_count(self, a, b):
+        return int(self.counts[self.ids[a], self.ids[b]])
+
+    def top_pairs(self, k=10):
+        """The ``k`` most frequent pairs as a Series indexed by name tuples
+        (names in alphabetical order, like ``get_artist_combinations``)."""
+        upper = sparse.triu(self.counts, 1).tocoo()
+        if upper.nnz == 0:
+            return pd.Series(dtype=np.int64)
+        k = min(k, upper.nnz)
+        top = np.argpartition(-upper.data, k - 1)[:k]
+        top = top[np.lexsort((upper.col[top], upper.row[top], -upper.data[top]))]
+        names = [tuple(sorted((self.names[i], self.names[j]))) for i, j in zip(upper.row[top], upper.col[top])]
+        return pd.Series(upper.data[top], index=pd.Index(names, tupleize_cols=False), name='count')
+
+    def degree(self, artist=None, weighted=False):
+        """Number of distinct collaborators (or total pair count when
+        ``weighted``) of one artist, or of every artist as a Series."""
+        values = np.asarray(self.counts.sum(axis=1)).ravel() if weighted else np.diff(self.counts.indptr)
+        if artist is not None:
+            return int(values[self.ids[artist]])
+        return pd.Series(values, index=self.names, name='degree')
+
+    def collaborators(self, artist):
+        """Collaborators of ``artist`` and how often they appear together, most frequent first."""
+        row = self.counts.getrow(self.ids[artist])
+        result = pd.Series(row.data, index=[self.names[i] for i in row.indices], name='count')
+        return result.sort_values(ascending=False, kind='stable')
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from itertools import combinations
+
+    from streaming_stats import DATA_FILE, ENCODING
+
+    parser = argparse.ArgumentParser(description="Compare pair counting with the notebook's list-of-tuples approach.")
+    parser.add_argument('--repeat', type=int, default=1000, help="replicate the catalog this many times")
+    args = parser.parse_args()
+
+    artists = pd.read_csv(DATA_FILE, encoding=ENCODING)['artist(s)_name']
+    artists = pd.concat([artists] * args.repeat, ignore_index=True)
+
+    start = time.perf_counter()
+    lists = artists.str.split(', ')
+    lists = lists[lists.apply(len) > 1]
+    pairs = [c for artists_list in lists for c in combinations(sorted(artists_list), 2)]
+    pd.Series(pairs).value_counts().head(10)
+    print(f"list of tuples:     {time.perf_counter() - start:8.3f}s")
+
+    start = time.perf_counter()
+    graph = CollaborationGraph.from_tracks(artists)
+    top = graph.top_pairs(10)
+    print(f"CollaborationGraph: {time.perf_counter() - start:8.3f}s  ({len(artists):,} tracks, {graph.n_artists:,} artists)")
+    print(top)
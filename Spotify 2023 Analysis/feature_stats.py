@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""Batched statistics for the Spotify audio-feature columns.
+
+Sections 3, 6 and 7 of spotify_2023_analysis.py scan the frame once per
+feature (``streams.corr(feature)``, ``groupby(artist)[feature].mean()``,
+``histplot``). ``feature_stats`` copies ``streams`` and all features into one
+float64 block and computes, in one pass over it:
+
+- Pearson and Spearman correlations of every column with ``streams``,
+- per-group (e.g. per-artist) means of every feature, via one sparse one-hot
+  matrix product,
+- histogram counts for every feature with a single ``bincount``, and binned
+  Gaussian KDE curves derived from them.
+
+Rows are split across processes with ``processes > 1``: each worker returns
+additive partials (co-moments, group sums, bin counts) that are merged in the
+parent, so cost grows linearly with rows and features. Spearman ranks are
+computed once for the whole block before it is split. Correlations use the
+rows where ``streams`` and all features are present.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.stats import rankdata
+
+PERCENT_FEATURES = ['danceability_%', 'valence_%', 'energy_%', 'acousticness_%', 'instrumentalness_%',
+                    'liveness_%', 'speechiness_%']
+
+
+@dataclass
+class FeatureStats:
+    """``pearson`` / ``spearman``: Series over features; ``group_means``:
+    groups x features; ``histograms`` / ``kde``: feature -> ``(counts, edges)``
+    / ``(grid, density)``."""
+    pearson: pd.Series
+    spearman: pd.Series
+    group_means: pd.DataFrame
+    histograms: dict
+    kde: dict
+
+
+def _comoments(X):
+    """``(n, mean, centred co-moment matrix)`` of the rows of ``X``."""
+    n = len(X)
+    if n == 0:
+        return 0, np.zeros(X.shape[1]), np.zeros((X.shape[1], X.shape[1]))
+    mean = X.mean(axis=0)
+    centered = X - mean
+    return n, mean, centered.T @ centered
+
+
+def _merge_comoments(a, b):
+    n1, mean1, c1 = a
+    n2, mean2, c2 = b
+    n = n1 + n2
+    if n1 == 0 or n2 == 0:
+        return b if n1 == 0 else a
+    delta = mean2 - mean1
+    return n, mean1 + delta * n2 / n, c1 + c2 + np.outer(delta, delta) * n1 * n2 / n
+
+
+def _corr_with_first(comoments):
+    _, _, c = comoments
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return c[0, 1:] / np.sqrt(c[0, 0] * np.diag(c)[1:])
+
+
+def _average_ranks(values):
+    """``rankdata(values)`` (average ties); small-range integer columns such
+    as the percentage features are ranked by counting instead of sorting."""
+    lo, hi = values.min(), values.max()
+    if hi - lo < 1 << 20 and np.array_equal(values, np.round(values)):
+        offsets = (values - lo).astype(np.int64)
+        counts = np.bincount(offsets)
+        below = np.cumsum(counts) - counts
+        return (below + (counts + 1) / 2.0)[offsets]
+    return rankdata(values)
+
+
+def _bin_index(x, edges):
+    """Bin of every value of ``x`` for the sorted ``edges``. As in
+    ``np.histogram`` bins are half-open except the last, which also holds the
+    right edge; flooring ``(x - lo) / width`` instead misplaces values that sit
+    on an interior edge by one rounding step."""
+    idx = np.searchsorted(edges, x, side='right') - 1
+    return np.clip(idx, 0, len(edges) - 2)
+
+
+def _edges(lo, hi, bins):
+    """Per-feature bin edges, computed as ``np.histogram(range=(lo, hi))`` does."""
+    return np.array([np.linspace(a, b, bins + 1) for a, b in zip(lo, hi)])
+
+
+def _partial(args):
+    block, ranks, codes, n_groups, edge_sets = args
+    complete = ~np.isnan(block).any(axis=1)
+    pearson = _comoments(block[complete])
+    spearman = _comoments(ranks[complete])
+
+    features = block[:, 1:]
+    present = ~np.isnan(features)
+    onehot = sparse.csr_matrix((np.ones(len(codes)), (codes, np.arange(len(codes)))), shape=(n_groups, len(codes)))
+    sums = onehot @ np.where(present, features, 0.0)
+    counts = onehot @ present.astype(float)
+
+    # Column-major, so each feature's values are one contiguous slice
+    cols, rows = np.nonzero(present.T)
+    values = features[rows, cols]
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(cols, minlength=features.shape[1]))])
+    hists = []
+    for edges in edge_sets:
+        bins = edges.shape[1] - 1
+        flat = cols * bins
+        for j in range(features.shape[1]):
+            flat[bounds[j]:bounds[j + 1]] += _bin_index(values[bounds[j]:bounds[j + 1]], edges[j])
+        hists.append(np.bincount(flat, minlength=features.shape[1] * bins).reshape(-1, bins))
+    return pearson, spearman, sums, counts, hists
+
+
+def _kde_from_histogram(counts, edges, grid_size):
+    """Gaussian KDE (Scott's bandwidth, as seaborn) evaluated on a regular grid
+    from finely binned counts instead of every observation."""
+    centers = (edges[:-1] + edges[1:]) / 2
+    n = counts.sum()
+    if n < 2:
+        return centers, np.zeros_like(centers)
+    mean = (counts * centers).sum() / n
+    std = np.sqrt((counts * (centers - mean) ** 2).sum() / (n - 1))
+    bandwidth = std * n ** (-1 / 5)
+    step = edges[1] - edges[0]
+    if bandwidth <= 0:
+        return centers, counts / (n * step)
+    half = int(np.ceil(4 * bandwidth / step))
+    offsets = np.arange(-half, half + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    density = np.convolve(counts, kernel, mode='full')[half:half + grid_size] / n
+    return centers, density
+
+
+def feature_stats(frame, features=PERCENT_FEATURES, target='streams', group_by='artist(s)_name', bins=30,
+                  bin_range=None, kde_grid=256, processes=1, chunk_rows=1_000_000):
+    """Correlations with ``target``, per-group means and histograms/KDEs for
+    all ``features`` in one batched pass.
+
+    ``bin_range=None`` bins every feature over its own min..max, like
+    ``sns.histplot``; give e.g. ``(0, 100)`` to share edges.
+    """
+    features = list(features)
+    block = np.column_stack([pd.to_numeric(frame[target], errors='coerce').to_numpy(dtype=float)] +
+                            [frame[f].to_numpy(dtype=float) for f in features])
+    codes, groups = pd.factorize(frame[group_by], use_na_sentinel=False)
+
+    complete = ~np.isnan(block).any(axis=1)
+    ranks = np.full(block.shape, np.nan)
+    ranks[complete] = np.column_stack([_average_ranks(column) for column in block[complete].T])
+
+    values = block[:, 1:]
+    if bin_range is None:
+        lo, hi = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+    else:
+        lo, hi = np.full(len(features), bin_range[0], float), np.full(len(features), bin_range[1], float)
+    fine = max(kde_grid, bins)
+    # A constant feature gets a unit-wide range around its value, like np.histogram
+    lo, hi = np.where(hi > lo, lo, lo - 0.5), np.where(hi > lo, hi, hi + 0.5)
+    edge_sets = (_edges(lo, hi, bins), _edges(lo, hi, fine))
+
+    chunks = [(block[i:i + chunk_rows], ranks[i:i + chunk_rows], codes[i:i + chunk_rows], len(groups), edge_sets)
+              for i in range(0, len(block), chunk_rows)]
+    if processes == 1 or len(chunks) == 1:
+        partials = [_partial(c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            partials = list(pool.map(_partial, chunks))
+
+    pearson, spearman, sums, counts, (hist, fine_hist) = partials[0]
+    for p in partials[1:]:
+        pearson = _merge_comoments(pearson, p[0])
+        spearman = _merge_comoments(spearman, p[1])
+        sums, counts = sums + p[2], counts + p[3]
+        hist, fine_hist = hist + p[4][0], fine_hist + p[4][1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = pd.DataFrame(sums / counts, index=pd.Index(groups, name=group_by), columns=features)
+
+    histograms, kde = {}, {}
+    for j, feature in enumerate(features):
+        histograms[feature] = (hist[j], edge_sets[0][j])
+        kde[feature] = _kde_from_histogram(fine_hist[j], edge_sets[1][j], fine)
+
+    return FeatureStats(pd.Series(_corr_with_first(pearson), index=features, name='pearson'),
+                        pd.Series(_corr_with_first(spearman), index=features, name='spearman'),
+                        means, histograms, kde)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from streaming_stats import DATA_FILE, ENCODING
+
+    parser = argparse.ArgumentParser(description="Time batched feature statistics against per-feature pandas calls.")
+    parser.add_argument('--repeat', type=int, default=1000, help="replicate the catalog this many times")
+    parser.add_argument('--processes', type=int, default=1)
+    args = parser.parse_args()
+
+    data = pd.read_csv(DATA_FILE, encoding=ENCODING)
+    data['streams'] = pd.to_numeric(data['streams'], errors='coerce')
+    data = pd.concat([data] * args.repeat, ignore_index=True)
+
+    start = time.perf_counter()
+    for feature in PERCENT_FEATURES:
+        data['streams'].corr(data[feature])
+        data['streams'].corr(data[feature], method='spearman')
+        data.groupby('artist(s)_name')[feature].mean()
+        np.histogram(data[feature], bins=30)
+    print(f"per-feature pandas: {time.perf_counter() - start:8.3f}s")
+
+    start = time.perf_counter()
+    stats = feature_stats(data, processes=args.processes, chunk_rows=max(len(data) // max(args.processes, 1), 1))
+    print(f"feature_stats:      {time.perf_counter() - start:8.3f}s  ({len(data):,} rows)")
+    print(pd.concat([stats.pearson, stats.spearman], axis=1))
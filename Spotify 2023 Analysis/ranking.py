@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""Precomputed top-K rankings over the track catalog.
+
+The notebook answers every "top 10 by X" question by sorting the whole frame
+(``sort_values(...).head(10)``, ``groupby(...).sum().sort_values()``).
+``RankingIndex`` keeps, per metric, the leading ``depth`` positions in rank
+order so a top-K query with ``k <= depth`` is a slice. The prefix is built
+with ``argpartition`` in O(n + depth log depth) and deepened (doubling) only
+when a deeper query comes in.
+
+Metrics are sums of catalog columns (``spotify_total`` is playlists + charts)
+or group sums (``artist_streams`` is streams per ``artist(s)_name``). Changing
+counts with ``update`` repositions only the touched rows inside each affected
+prefix. Ties rank by catalog order, as in ``nlargest``, and NaN values never
+rank.
+"""
+
+import bisect
+
+import numpy as np
+import pandas as pd
+
+TRACK_METRICS = {
+    'in_spotify_playlists': ['in_spotify_playlists'],
+    'spotify_total': ['in_spotify_playlists', 'in_spotify_charts'],
+    'apple_total': ['in_apple_playlists', 'in_apple_charts'],
+    'streams': ['streams'],
+}
+GROUP_METRICS = {
+    'artist_streams': ('artist(s)_name', 'streams'),
+}
+
+
+class TopK:
+    """Rank prefix over a float array, ordered by ``(-value, position)``."""
+
+    def __init__(self, values, depth=64):
+        self.values = np.asarray(values, dtype=float)
+        self.depth = depth
+        self.prefix = np.empty(0, dtype=np.int64)
+        self.complete = False
+        self._build(depth)
+
+    def _build(self, depth):
+        values = np.where(np.isnan(self.values), -np.inf, self.values)
+        ranked = np.count_nonzero(~np.isnan(self.values))
+        depth = min(depth, ranked)
+        if depth == 0:
+            candidates = np.empty(0, dtype=np.int64)
+        elif depth == len(values):
+            candidates = np.arange(len(values))
+        else:
+            kth = -np.partition(-values, depth - 1)[depth - 1]
+            above = np.flatnonzero(values > kth)
+            ties = np.flatnonzero(values == kth)[:depth - len(above)]
+            candidates = np.concatenate([above, ties])
+        self.prefix = candidates[np.lexsort((candidates, -values[candidates]))]
+        self.depth = max(depth, 1)
+        self.complete = len(self.prefix) == ranked
+
+    def _rank_key(self, position):
+        return -self.values[position], position
+
+    def top(self, k):
+        """Positions of the ``k`` largest values in rank order."""
+        if k > len(self.prefix) and not self.complete:
+            depth = self.depth
+            while depth < k:
+                depth *= 2
+            self._build(depth)
+        return self.prefix[:k]
+
+    def set(self, positions, values):
+        """Change ``values[positions]`` and reposition them in the prefix."""
+        positions = np.atleast_1d(np.asarray(positions, dtype=np.int64))
+        values = np.broadcast_to(np.asarray(values, dtype=float), positions.shape)
+        if len(positions) > self.depth:
+            self.values[positions] = values
+            self._build(self.depth)
+            return
+        prefix = self.prefix.tolist()
+        for position, value in zip(positions.tolist(), values.tolist()):
+            self.values[position] = value
+            if position in prefix:
+                # The remaining entries are still the leaders among all other rows
+                prefix.remove(position)
+            if np.isnan(value):
+                continue
+            if not self.complete and (not prefix or self._rank_key(position) > self._rank_key(prefix[-1])):
+                # Below the prefix boundary: it may trail rows outside the prefix
+                continue
+            prefix.insert(bisect.bisect(prefix, self._rank_key(position), key=self._rank_key), position)
+            if not self.complete and len(prefix) > self.depth:
+                prefix.pop()
+        self.prefix = np.asarray(prefix, dtype=np.int64)
+
+
+class RankingIndex:
+    """Top-K queries over catalog metrics; see the module docstring.
+
+    ``frame`` is copied, and ``update`` writes new counts into the copy so
+    query results always show current values.
+    """
+
+    def __init__(self, frame, metrics=TRACK_METRICS, groups=GROUP_METRICS, depth=64):
+        self.frame = frame.copy()
+        self.metrics = {name: list(columns) for name, columns in metrics.items()}
+        self.groups = dict(groups)
+        self.depth = depth
+
+        needed = {c for columns in self.metrics.values() for c in columns} | {c for _, c in self.groups.values()}
+        for column in needed:
+            self.frame[column] = pd.to_numeric(self.frame[column], errors='coerce')
+        self._columns = {c: self.frame[c].to_numpy(dtype=float, copy=True) for c in needed}
+        self._rankings = {name: TopK(self._metric_values(name), depth) for name in self.metrics}
+
+        self._group_codes, self._group_labels = {}, {}
+        for name, (key, column) in self.groups.items():
+            codes, labels = pd.factorize(self.frame[key], sort=True)
+            totals = np.bincount(codes[codes >= 0], weights=np.nan_to_num(self._columns[column][codes >= 0]),
+                                 minlength=len(labels))
+            self._group_codes[name], self._group_labels[name] = codes, labels
+            self._rankings[name] = TopK(totals, depth)
+
+    def _metric_values(self, name, rows=slice(None)):
+        columns = self.metrics[name]
+        total = self._columns[columns[0]][rows].copy()
+        for column in columns[1:]:
+            total += self._columns[column][rows]
+        return total
+
+    def top(self, metric, k=10, columns=('track_name', 'artist(s)_name')):
+        """Top ``k`` tracks by ``metric`` as a frame, or for a group metric a
+        Series of group totals indexed by group label."""
+        positions = self._rankings[metric].top(k)
+        values = self._rankings[metric].values[positions]
+        if metric in self.groups:
+            key, column = self.groups[metric]
+            return pd.Series(values, index=pd.Index(self._group_labels[metric][positions], name=key), name=column)
+        columns = list(columns) + [c for c in self.metrics[metric] if c not in columns]
+        result = self.frame.iloc[positions][columns]
+        if metric not in result.columns:
+            result[metric] = values
+        return result
+
+    def update(self, rows, **columns):
+        """Set new values for the tracks labelled ``rows``, e.g.
+        ``update([12, 40], in_spotify_charts=[3, 0])``, and refresh every
+        metric that uses those columns. A row given more than once takes its
+        last value, as with repeated assignment."""
+        positions = self.frame.index.get_indexer(np.atleast_1d(rows))
+        if (positions < 0).any():
+            raise KeyError("unknown rows: %s" % list(np.atleast_1d(rows)[positions < 0]))
+        # Group deltas are taken against the previous values, so each row may appear once
+        _, last = np.unique(positions[::-1], return_index=True)
+        last = len(positions) - 1 - last
+        shape, positions = positions.shape, positions[last]
+        for column, values in columns.items():
+            if column not in self._columns:
+                raise KeyError("%r is not used by any metric" % column)
+            values = np.broadcast_to(np.asarray(values, dtype=float), shape)[last]
+            previous = self._columns[column][positions].copy()
+            self._columns[column][positions] = values
+            if self.frame[column].dtype.kind in 'iu' and not (values == np.round(values)).all():
+                self.frame[column] = self.frame[column].astype(float)
+            self.frame.iloc[positions, self.frame.columns.get_loc(column)] = values.astype(self.frame[column].dtype)
+
+            for name, used in self.metrics.items():
+                if column in used:
+                    self._rankings[name].set(positions, self._metric_values(name, positions))
+            for name, (_, group_column) in self.groups.items():
+                if group_column != column:
+                    continue
+                codes = self._group_codes[name][positions]
+                keep = codes >= 0
+                delta = np.nan_to_num(values[keep]) - np.nan_to_num(previous[keep])
+                changed, inverse = np.unique(codes[keep], return_inverse=True)
+                ranking = self._rankings[name]
+                ranking.set(changed, ranking.values[changed] + np.bincount(inverse, weights=delta))
+
+
+def benchmark(repeat=1000, queries=100, k=10):
+    """Index build and query times against sorting the frame per query."""
+    import time
+
+    from streaming_stats import DATA_FILE, ENCODING
+
+    data = pd.concat([pd.read_csv(DATA_FILE, encoding=ENCODING)] * repeat, ignore_index=True)
+    data['streams'] = pd.to_numeric(data['streams'], errors='coerce')
+
+    start = time.perf_counter()
+    index = RankingIndex(data)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(queries):
+        for metric in index.metrics:
+            index.top(metric, k)
+        index.top('artist_streams', k)
+    indexed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(queries):
+        for columns in index.metrics.values():
+            sum(data[c] for c in columns).sort_values(ascending=False).head(k)
+        data.groupby('artist(s)_name')['streams'].sum().sort_values(ascending=False).head(k)
+    sorted_ = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(0)
+    for _ in range(queries):
+        index.update(rng.choice(data.index, 10), in_spotify_charts=rng.integers(0, 150, 10))
+    updates = time.perf_counter() - start
+    return {'rows': len(data), 'build': build, 'indexed_queries': indexed, 'sorted_queries': sorted_,
+            'updates': updates}
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the top-K ranking index.")
+    parser.add_argument('--repeat', type=int, default=1000, help="replicate the catalog this many times")
+    parser.add_argument('--queries', type=int, default=100, help="query rounds over all metrics")
+    args = parser.parse_args()
+
+    result = benchmark(args.repeat, args.queries)
+    print(f"{result['rows']:,} rows, {args.queries} rounds of top-10 queries over every metric")
+    print(f"  index build:            {result['build']:8.3f}s")
+    print(f"  indexed queries:        {result['indexed_queries']:8.3f}s")
+    print(f"  sort per query:         {result['sorted_queries']:8.3f}s")
+    print(f"  {args.queries} updates of 10 tracks: {result['updates']:8.3f}s")
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Release dates straight from integer year/month/day columns.
+
+Section 8 of spotify_2023_analysis.py joins ``released_year``,
+``released_month`` and ``released_day`` into strings and parses them back
+with ``pd.to_datetime(..., errors='coerce')``. ``build_release_dates`` does
+the same with datetime64 arithmetic: it validates the month and the day
+against the length of that month (leap years included) and returns NaT for
+anything invalid, just like the coerced string parse.
+
+``temporal_summary`` then computes release counts and the means of streams,
+danceability and energy per year or per month in one ``bincount`` pass over
+integer period codes.
+"""
+
+import numpy as np
+import pandas as pd
+
+TEMPORAL_COLUMNS = ['streams', 'danceability_%', 'energy_%']
+
+
+def _as_int(values):
+    values = np.asarray(values, dtype=float)
+    valid = np.isfinite(values) & (values == np.round(values))
+    return np.where(valid, values, 0).astype(np.int64), valid
+
+
+def build_release_dates(year, month, day):
+    """``datetime64[ns]`` Series of release dates; invalid dates become NaT."""
+    index = getattr(year, 'index', None)
+    y, valid_y = _as_int(year)
+    m, valid_m = _as_int(month)
+    d, valid_d = _as_int(day)
+    valid = valid_y & valid_m & valid_d & (y >= 1678) & (y <= 2261) & (m >= 1) & (m <= 12) & (d >= 1)
+
+    # Out-of-range parts are replaced by 1 so the arithmetic stays defined
+    y = np.where(valid, y, 1970)
+    m = np.where(valid, m, 1)
+    months = (y - 1970) * 12 + (m - 1)
+    first = months.astype('datetime64[M]')
+    days_in_month = ((first + 1).astype('datetime64[D]') - first.astype('datetime64[D]')).astype(np.int64)
+    valid &= d <= days_in_month
+
+    dates = first.astype('datetime64[D]') + np.where(valid, d - 1, 0).astype('timedelta64[D]')
+    dates = np.where(valid, dates, np.datetime64('NaT')).astype('datetime64[ns]')
+    return pd.Series(dates, index=index, name='release_date')
+
+
+def temporal_summary(frame, freq='year', columns=TEMPORAL_COLUMNS, dates=None):
+    """Release counts and column means per ``'year'`` or ``'month'``.
+
+    Periods are integer codes derived from the year/month columns (or from
+    ``dates`` if given); rows with invalid dates are left out as with the
+    notebook's coerced parse. Every column is reduced with ``np.bincount``.
+    """
+    if dates is None:
+        dates = build_release_dates(frame['released_year'], frame['released_month'], frame['released_day'])
+    stamps = np.asarray(dates, dtype='datetime64[M]')
+    valid = ~np.isnat(stamps)
+    months = stamps[valid].astype(np.int64)
+    if freq == 'year':
+        codes = months // 12
+    elif freq == 'month':
+        codes = months
+    else:
+        raise ValueError("freq must be 'year' or 'month'")
+    if len(codes) == 0:
+        return pd.DataFrame(columns=['releases'] + list(columns))
+
+    base = codes.min()
+    codes = codes - base
+    releases = np.bincount(codes)
+    result = {'releases': releases}
+    for column in columns:
+        values = pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=float)[valid]
+        present = ~np.isnan(values)
+        sums = np.bincount(codes[present], weights=values[present], minlength=len(releases))
+        counts = np.bincount(codes[present], minlength=len(releases))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[column] = sums / counts
+
+    periods = np.arange(len(releases)) + base
+    if freq == 'year':
+        index = pd.Index(periods + 1970, name='year')
+    else:
+        index = pd.PeriodIndex(periods.astype('datetime64[M]'), freq='M', name='month')
+    return pd.DataFrame(result, index=index)[lambda df: df['releases'] > 0]
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from streaming_stats import DATA_FILE, ENCODING
+
+    parser = argparse.ArgumentParser(description="Time integer date construction against the string round trip.")
+    parser.add_argument('--repeat', type=int, default=1000, help="replicate the catalog this many times")
+    args = parser.parse_args()
+
+    data = pd.read_csv(DATA_FILE, encoding=ENCODING)
+    data = pd.concat([data] * args.repeat, ignore_index=True)
+
+    start = time.perf_counter()
+    strings = data['released_year'].astype(str) + '-' + data['released_month'].astype(str) + '-' + \
+        data['released_day'].astype(str)
+    parsed = pd.to_datetime(strings, errors='coerce')
+    print(f"string round trip:   {time.perf_counter() - start:8.3f}s")
+
+    start = time.perf_counter()
+    built = build_release_dates(data['released_year'], data['released_month'], data['released_day'])
+    print(f"build_release_dates: {time.perf_counter() - start:8.3f}s  ({len(data):,} rows, "
+          f"identical: {parsed.astype('datetime64[ns]').equals(built.rename(None))})")
+
+    start = time.perf_counter()
+    summary = temporal_summary(data, dates=built)
+    print(f"temporal_summary:    {time.perf_counter() - start:8.3f}s")
+    print(summary.tail())
@@ -11,7 +11,6 @@ import numpy as np
 import pandas as pd # for data processing, CSV file I/O (e.g. pd.read_csv)
 import matplotlib.pyplot as plt
 import seaborn as sns
-from itertools import combinations
 
 """# 1. Importing the data"""
 
@@ -54,8 +53,13 @@ plt.show()
 
 """# 4. The top 10 songs based on their presence in Spotify playlists"""
 
+# Ranking index answering the top-N questions below without sorting the catalog (see ranking.py)
+from ranking import RankingIndex
+
+ranking = RankingIndex(spotify_data)
+
 # Selecting the top 10 songs based on their presence in Spotify playlists
-top_songs_in_playlists = spotify_data.sort_values(by='in_spotify_playlists', ascending=False).head(10)
+top_songs_in_playlists = ranking.top('in_spotify_playlists', 10)
 
 # Creating a combined column for track and artist name for better visualization
 top_songs_in_playlists['track_artist'] = top_songs_in_playlists['track_name'] + " (" + top_songs_in_playlists['artist(s)_name'] + ")"
@@ -76,7 +80,7 @@ plt.show()
 spotify_data['streams'] = pd.to_numeric(spotify_data['streams'], errors='coerce')
 
 # Grouping by artist(s) again and summing up their streams
-artist_streams = spotify_data.groupby('artist(s)_name')['streams'].sum().sort_values(ascending=False).head(10)
+artist_streams = ranking.top('artist_streams', 10)
 
 # Plotting the artists with the most streams again
 plt.figure(figsize=(12, 10))
@@ -92,6 +96,11 @@ plt.show()
 # List of features to compare with streams
 features = ['danceability_%', 'valence_%', 'energy_%', 'acousticness_%', 'liveness_%', 'speechiness_%']
 
+# Correlations with streams and per-artist means for all features in one batched pass (see feature_stats.py)
+from feature_stats import feature_stats
+
+stats = feature_stats(spotify_data, features)
+
 # Setting up the figure and axes
 fig, axes = plt.subplots(nrows=len(features), figsize=(12, 20))
 
@@ -102,7 +111,7 @@ for i, feature in enumerate(features):
     axes[i].set_title(f'Streams vs. {feature}', fontsize=14)
     axes[i].set_xlabel(feature)
     axes[i].set_ylabel('Streams')
-    corr = spotify_data['streams'].corr(spotify_data[feature])
+    corr = stats.pearson[feature]
     correlations[feature] = corr
     axes[i].annotate(f'Correlation: {corr:.2f}', xy=(0.05, 0.9), xycoords='axes fraction', fontsize=12)
 
@@ -137,7 +146,7 @@ fig, axes = plt.subplots(nrows=len(features), figsize=(12, 20))
 
 # Plotting average values for each feature for the top artists
 for i, feature in enumerate(features):
-    artist_feature_avg = top_artists_data.groupby('artist(s)_name')[feature].mean().sort_values(ascending=False)
+    artist_feature_avg = stats.group_means.loc[top_artists, feature].sort_values(ascending=False)
     sns.barplot(x=artist_feature_avg.values, y=artist_feature_avg.index, ax=axes[i], palette="viridis")
     axes[i].set_title(f'Average {feature} for Top Artists', fontsize=14)
     axes[i].set_xlabel(f'Average {feature}')
@@ -156,16 +165,16 @@ unique_values = {
 }
 
 
-# Creating a 'release_date_string' column
-spotify_data['release_date_string'] = spotify_data['released_year'].astype(str) + '-' + \
-                                      spotify_data['released_month'].astype(str) + '-' + \
-                                      spotify_data['released_day'].astype(str)
+# Building the release dates straight from the integer columns (invalid dates become NaT) and the yearly
+# release counts and averages in one pass (see release_dates.py)
+from release_dates import build_release_dates, temporal_summary
 
-# Converting the 'release_date_string' column to datetime data type
-spotify_data['release_date'] = pd.to_datetime(spotify_data['release_date_string'], errors='coerce')
+spotify_data['release_date'] = build_release_dates(spotify_data['released_year'], spotify_data['released_month'],
+                                                   spotify_data['released_day'])
+yearly_summary = temporal_summary(spotify_data, 'year', dates=spotify_data['release_date'])
 
 # Rechecking the distribution of song releases by year
-yearly_releases = spotify_data['release_date'].dt.year.value_counts().sort_index()
+yearly_releases = yearly_summary['releases']
 
 # Plotting the distribution of song releases by year
 plt.figure(figsize=(14, 7))
@@ -178,7 +187,7 @@ plt.tight_layout()
 plt.show()
 
 # Calculating yearly averages for streams, danceability, and energy
-yearly_averages = spotify_data.groupby(spotify_data['release_date'].dt.year)[['streams', 'danceability_%', 'energy_%']].mean()
+yearly_averages = yearly_summary[['streams', 'danceability_%', 'energy_%']]
 
 # Plotting the yearly trends
 fig, axes = plt.subplots(nrows=3, figsize=(14, 15))
@@ -229,14 +238,10 @@ plt.tight_layout()
 plt.show()
 
 # Identifying top 10 songs for Spotify based on their presence in playlists and charts
-top_songs_spotify = spotify_data[['track_name', 'artist(s)_name', 'in_spotify_playlists', 'in_spotify_charts']]
-top_songs_spotify['spotify_total'] = top_songs_spotify['in_spotify_playlists'] + top_songs_spotify['in_spotify_charts']
-top_songs_spotify = top_songs_spotify.sort_values(by='spotify_total', ascending=False).head(10)
+top_songs_spotify = ranking.top('spotify_total', 10)
 
 # Identifying top 10 songs for Apple Music based on their presence in playlists and charts
-top_songs_apple = spotify_data[['track_name', 'artist(s)_name', 'in_apple_playlists', 'in_apple_charts']]
-top_songs_apple['apple_total'] = top_songs_apple['in_apple_playlists'] + top_songs_apple['in_apple_charts']
-top_songs_apple = top_songs_apple.sort_values(by='apple_total', ascending=False).head(10)
+top_songs_apple = ranking.top('apple_total', 10)
 
 top_songs_spotify
 
@@ -273,16 +278,11 @@ collaborations = spotify_data[spotify_data['artists_list'].apply(len) > 1]
 # Displaying the first few rows of the collaborations dataframe
 collaborations[['track_name', 'artist(s)_name', 'streams', 'in_spotify_playlists', 'in_spotify_charts']].head()
 
-# Function to get all combinations of artists for each track
-def get_artist_combinations(artists_list):
-    return list(combinations(sorted(artists_list), 2))
-
-# Apply the function to the 'artists_list' column to get all artist combinations
-collaborations['artist_combinations'] = collaborations['artists_list'].apply(get_artist_combinations)
+# Counting artist pairs with integer ids and a sparse co-occurrence matrix (see collaborations.py)
+from collaborations import CollaborationGraph
 
-# Flatten the list of artist combinations to count the frequency of each combination
-all_combinations = [combo for sublist in collaborations['artist_combinations'] for combo in sublist]
-frequent_collaborators = pd.Series(all_combinations).value_counts().head(10)
+collaboration_graph = CollaborationGraph.from_tracks(spotify_data['artist(s)_name'])
+frequent_collaborators = collaboration_graph.top_pairs(10)
 
 # Plotting the top 10 frequent collaborator pairs
 plt.figure(figsize=(12, 8))
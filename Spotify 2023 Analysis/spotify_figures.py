@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""Figures of the Spotify 2023 analysis as pure functions for headless rendering.
+
+Every function takes the track frame (plus keyword parameters) and returns a
+matplotlib Figure without showing it. ``FIGURES`` maps output names to
+``(function, params)`` and ``SOURCES`` lists the files the figures depend on;
+render_figures.py in the repository root uses both to render the figures in
+parallel into ``Visualizations/`` and to skip unchanged ones.
+"""
+
+import os
+
+import pandas as pd
+
+from release_dates import temporal_summary
+from streaming_stats import DATA_FILE, ENCODING
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(HERE, 'Visualizations')
+SOURCES = [DATA_FILE]
+
+PERCENT_FEATURES = ['danceability_%', 'energy_%', 'valence_%', 'acousticness_%', 'instrumentalness_%',
+                    'liveness_%', 'speechiness_%']
+STREAM_FEATURES = ['danceability_%', 'valence_%', 'energy_%', 'acousticness_%', 'liveness_%', 'speechiness_%']
+
+
+def load_data():
+    data = pd.read_csv(DATA_FILE, encoding=ENCODING)
+    data['streams'] = pd.to_numeric(data['streams'], errors='coerce')
+    return data
+
+
+def _track_artist(frame):
+    return frame['track_name'] + " (" + frame['artist(s)_name'] + ")"
+
+
+def _collaborations(data):
+    return data[data['artist(s)_name'].str.split(', ').str.len() > 1]
+
+
+def _bars(x, y, title, xlabel, ylabel, figsize=(12, 10), ax=None):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig = None
+    if ax is None:
+        fig, ax = plt.subplots(figsize=figsize)
+    sns.barplot(x=list(x), y=list(y), hue=list(y), palette="viridis", legend=False, orient='h', ax=ax)
+    ax.set_title(title, fontsize=16)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    return fig
+
+
+def feature_distributions(data, features=PERCENT_FEATURES, bins=30):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Scoped, so figures rendered later in the same process keep the default style
+    with sns.axes_style("whitegrid"):
+        fig, axes = plt.subplots(nrows=len(features), figsize=(12, 15))
+        for ax, feature in zip(axes, features):
+            sns.histplot(data[feature], ax=ax, bins=bins, kde=True)
+            ax.set_title(f'Distribution of {feature}', fontsize=14)
+            ax.set_xlabel(feature)
+            ax.set_ylabel('Frequency')
+        fig.tight_layout()
+    return fig
+
+
+def top_songs_in_playlists(data, n=10):
+    top = data.nlargest(n, 'in_spotify_playlists')
+    fig = _bars(top['in_spotify_playlists'], _track_artist(top), f'Top {n} Songs Based on Presence in Spotify Playlists',
+                'Number of Playlists', 'Track (Artist)')
+    fig.tight_layout()
+    return fig
+
+
+def top_artists_by_streams(data, n=10):
+    artist_streams = data.groupby('artist(s)_name')['streams'].sum().nlargest(n)
+    fig = _bars(artist_streams.values, artist_streams.index, f'Top {n} Artists Based on Total Streams',
+                'Total Streams (in billions)', 'Artist(s) Name')
+    fig.tight_layout()
+    return fig
+
+
+def streams_vs_features(data, features=STREAM_FEATURES):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    from feature_stats import feature_stats
+
+    stats = feature_stats(data, features)
+    fig, axes = plt.subplots(nrows=len(features), figsize=(12, 20))
+    for ax, feature in zip(axes, features):
+        sns.scatterplot(x=data[feature], y=data['streams'], ax=ax, alpha=0.6)
+        ax.set_title(f'Streams vs. {feature}', fontsize=14)
+        ax.set_xlabel(feature)
+        ax.set_ylabel('Streams')
+        ax.annotate(f'Correlation: {stats.pearson[feature]:.2f}', xy=(0.05, 0.9), xycoords='axes fraction', fontsize=12)
+    fig.tight_layout()
+    return fig
+
+
+def features_for_top_artists(data, features=STREAM_FEATURES, n=10):
+    import matplotlib.pyplot as plt
+
+    from feature_stats import feature_stats
+
+    top_artists = data['artist(s)_name'].value_counts().head(n).index
+    means = feature_stats(data, features).group_means.loc[top_artists]
+    fig, axes = plt.subplots(nrows=len(features), figsize=(12, 20))
+    for ax, feature in zip(axes, features):
+        avg = means[feature].sort_values(ascending=False)
+        _bars(avg.values, avg.index, f'Average {feature} for Top Artists', f'Average {feature}', 'Artist(s) Name', ax=ax)
+    fig.tight_layout()
+    return fig
+
+
+def yearly_releases(data):
+    import matplotlib.pyplot as plt
+
+    counts = temporal_summary(data, 'year')['releases']
+    fig, ax = plt.subplots(figsize=(14, 7))
+    counts.plot(kind='bar', color='skyblue', ax=ax)
+    ax.set_title('Distribution of Song Releases by Year', fontsize=16)
+    ax.set_xlabel('Year')
+    ax.set_ylabel('Number of Songs Released')
+    ax.tick_params(axis='x', labelrotation=45)
+    fig.tight_layout()
+    return fig
+
+
+def yearly_trends(data):
+    import matplotlib.pyplot as plt
+
+    averages = temporal_summary(data, 'year')
+    fig, axes = plt.subplots(nrows=3, figsize=(14, 15))
+    panels = [('streams', 'teal', 'Average Streams', 'Average Streams'),
+              ('danceability_%', 'purple', 'Average Danceability', 'Average Danceability (%)'),
+              ('energy_%', 'orange', 'Average Energy', 'Average Energy (%)')]
+    for ax, (column, color, title, ylabel) in zip(axes, panels):
+        ax.plot(averages.index, averages[column], marker='o', color=color)
+        ax.set_title(f'Yearly Trend in {title}', fontsize=16)
+        ax.set_xlabel('Year')
+        ax.set_ylabel(ylabel)
+        ax.grid(True)
+    fig.tight_layout()
+    return fig
+
+
+def platform_totals(data):
+    import matplotlib.pyplot as plt
+
+    totals = {
+        'Spotify': data['in_spotify_playlists'].sum() + data['in_spotify_charts'].sum(),
+        'Apple Music': data['in_apple_playlists'].sum() + data['in_apple_charts'].sum(),
+    }
+    fig, ax = plt.subplots(figsize=(10, 7))
+    ax.bar(list(totals.keys()), list(totals.values()), color=['green', 'red'])
+    ax.set_title('Total Count of Tracks in Playlists/Charts: Spotify, Apple Music, Deezer', fontsize=16)
+    ax.set_ylabel('Total Count')
+    ax.set_xlabel('Platform')
+    fig.tight_layout()
+    return fig
+
+
+def top_songs_by_platform(data, n=10):
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(nrows=2, figsize=(12, 15))
+    for ax, (platform, label) in zip(axes, (('spotify', 'Spotify'), ('apple', 'Apple Music'))):
+        total = data[f'in_{platform}_playlists'] + data[f'in_{platform}_charts']
+        top = data.assign(total=total).nlargest(n, 'total')
+        _bars(top['total'], _track_artist(top), f'Top {n} Songs on {label} Based on Presence in Playlists/Charts',
+              'Total Presence', 'Track (Artist)', ax=ax)
+    fig.tight_layout()
+    return fig
+
+
+def collaborator_pairs(data, n=10):
+    from collaborations import CollaborationGraph
+
+    pairs = CollaborationGraph.from_tracks(data['artist(s)_name']).top_pairs(n)
+    fig = _bars(pairs.values, [' & '.join(pair) for pair in pairs.index], f'Top {n} Frequent Collaborator Pairs',
+                'Number of Collaborations', 'Artist Pairs', figsize=(12, 8))
+    fig.tight_layout()
+    return fig
+
+
+def collaboration_streams(data):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    comparison = pd.DataFrame({'Metrics': ['Average Streams'],
+                               'Collaborations': [_collaborations(data)['streams'].mean()],
+                               'Overall': [data['streams'].mean()]})
+    comparison = comparison.melt(id_vars=['Metrics'], value_vars=['Collaborations', 'Overall'])
+    fig, ax = plt.subplots(figsize=(12, 7))
+    sns.barplot(x='Metrics', y='value', hue='variable', data=comparison, palette="viridis", ax=ax)
+    ax.set_title('Comparison of Streams: Collaborations vs. Overall', fontsize=16)
+    ax.set_xlabel('')
+    ax.set_ylabel('')
+    ax.legend(title='')
+    fig.tight_layout()
+    return fig
+
+
+def collaboration_presence(data):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    collaborations = _collaborations(data)
+    labels = ['Collaborations', 'Overall']
+    values = [(collaborations['in_spotify_playlists'] + collaborations['in_spotify_charts']).mean(),
+              (data['in_spotify_playlists'] + data['in_spotify_charts']).mean()]
+    fig, ax = plt.subplots(figsize=(10, 7))
+    sns.barplot(x=labels, y=values, hue=labels, palette="viridis", legend=False, ax=ax)
+    ax.set_title('Average Spotify Presence: Collaborations vs. Overall', fontsize=16)
+    ax.set_ylabel('Average Presence')
+    fig.tight_layout()
+    return fig
+
+
+FIGURES = {
+    'feature_distributions': (feature_distributions, {'bins': 30}),
+    'top_songs_in_playlists': (top_songs_in_playlists, {'n': 10}),
+    'top_artists_by_streams': (top_artists_by_streams, {'n': 10}),
+    'streams_vs_features': (streams_vs_features, {}),
+    'features_for_top_artists': (features_for_top_artists, {'n': 10}),
+    'yearly_releases': (yearly_releases, {}),
+    'yearly_trends': (yearly_trends, {}),
+    'platform_totals': (platform_totals, {}),
+    'top_songs_by_platform': (top_songs_by_platform, {'n': 10}),
+    'collaborator_pairs': (collaborator_pairs, {'n': 10}),
+    'collaboration_streams': (collaboration_streams, {}),
+    'collaboration_presence': (collaboration_presence, {}),
+}
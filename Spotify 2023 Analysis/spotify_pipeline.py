@@ -0,0 +1,295 @@
+# -*- coding: utf-8 -*-
+"""The Spotify analysis sections as a lazy, memoized dependency graph.
+
+spotify_2023_analysis.py recomputes shared intermediates as it goes (streams
+converted in place halfway, release dates rebuilt per section, platform
+totals summed in several places). Here every intermediate and every section
+is a node of an ``AnalysisGraph``:
+
+    raw -> tracks -> {playlist_columns, stream_columns, temporal_columns}
+    raw -> basic_stats
+    playlist_columns -> top_songs, platform_comparison
+    stream_columns -> top_artists, collaborations (+ playlist_columns)
+    temporal_columns -> temporal_trends
+
+Requesting a node evaluates only its ancestors. Results are pickled to
+``.analysis_cache/`` under a key made of the node's code, the source of the
+project modules it calls into (see ``helper_source_hash``) and the *output*
+hashes of its inputs (the ``raw`` node is keyed on the CSV contents), so after
+a data change only nodes whose inputs actually changed are recomputed - e.g.
+a change to ``streams`` alone leaves ``top_songs`` cached::
+
+    python spotify_pipeline.py top_artists temporal_trends
+"""
+
+import ast
+import hashlib
+import inspect
+import os
+import pickle
+import textwrap
+
+import pandas as pd
+
+from release_dates import TEMPORAL_COLUMNS, build_release_dates, temporal_summary
+from streaming_stats import DATA_FILE, ENCODING
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, '.analysis_cache')
+
+
+def output_hash(value):
+    """Content hash of a node output (pandas objects are hashed by value)."""
+    digest = hashlib.sha1()
+    if isinstance(value, (pd.DataFrame, pd.Series, pd.Index)):
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        digest.update(repr(getattr(value, 'columns', getattr(value, 'name', None))).encode())
+    elif isinstance(value, dict):
+        for k in sorted(value, key=str):
+            digest.update(repr(k).encode())
+            digest.update(output_hash(value[k]).encode())
+    else:
+        digest.update(pickle.dumps(value))
+    return digest.hexdigest()
+
+
+def _imports(tree):
+    """``{bound name: top-level module}`` of the absolute imports in ``tree``."""
+    names = {}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                names[alias.asname or alias.name.split('.')[0]] = alias.name.split('.')[0]
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                names[alias.asname or alias.name] = node.module.split('.')[0]
+    return names
+
+
+def _parse(path):
+    with open(path, 'rb') as f:
+        return ast.parse(f.read(), path)
+
+
+def _global_names(code):
+    yield from code.co_names
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            yield from _global_names(const)
+
+
+def helper_source_hash(func, folder=HERE):
+    """Hash of the modules in ``folder`` that ``func`` calls into: those its
+    global names were imported from and those it imports itself, followed
+    transitively through their own imports."""
+    module_imports = _imports(_parse(inspect.getsourcefile(func)))
+    pending = [module_imports[n] for n in set(_global_names(func.__code__)) if n in module_imports]
+    pending.extend(_imports(ast.parse(textwrap.dedent(inspect.getsource(func)))).values())
+    seen = set()
+    while pending:
+        name = pending.pop()
+        path = os.path.join(folder, name + '.py')
+        if name in seen or not os.path.exists(path):
+            continue
+        seen.add(name)
+        pending.extend(_imports(_parse(path)).values())
+    digest = hashlib.sha1()
+    for name in sorted(seen):
+        digest.update(name.encode())
+        with open(os.path.join(folder, name + '.py'), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class AnalysisGraph:
+    """Nodes are functions of their dependencies' values; see the module docstring.
+
+    ``params`` holds settings the node functions close over; they are part of
+    every node's key.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, params=None):
+        self.cache_dir = cache_dir
+        self.params = params or {}
+        self.nodes = {}
+        self.computed = []
+        self._resolved = {}
+        self._values = {}
+        self._helper_hashes = {}
+
+    def node(self, *deps, name=None, source=None):
+        """Register the decorated function as a node depending on ``deps``.
+
+        ``source`` names a file whose contents become part of the node's key.
+        """
+        def register(func):
+            self.nodes[name or func.__name__] = (func, deps, source)
+            return func
+        return register
+
+    def _paths(self, name, key):
+        if not self.cache_dir:
+            return None, None
+        base = os.path.join(self.cache_dir, '%s-%s' % (name, key))
+        return base + '.pkl', base + '.hash'
+
+    def _key(self, name, dep_hashes):
+        func, _, source = self.nodes[name]
+        digest = hashlib.sha1(name.encode())
+        digest.update(inspect.getsource(func).encode())
+        if name not in self._helper_hashes:
+            self._helper_hashes[name] = helper_source_hash(func)
+        digest.update(self._helper_hashes[name].encode())
+        digest.update(repr(sorted(self.params.items())).encode())
+        if source is not None:
+            with open(source, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        for h in dep_hashes:
+            digest.update(h.encode())
+        return digest.hexdigest()[:20]
+
+    def _resolve(self, name):
+        """Return ``(key, output hash)`` of a node, computing it only when no
+        cache entry exists for its key."""
+        if name in self._resolved:
+            return self._resolved[name]
+        _, deps, _ = self.nodes[name]
+        key = self._key(name, [self._resolve(d)[1] for d in deps])
+        try:
+            with open(self._paths(name, key)[1]) as f:
+                result = (key, f.read().strip())
+        except (OSError, TypeError):
+            result = (key, self._compute(name, key))
+        self._resolved[name] = result
+        return result
+
+    def _compute(self, name, key):
+        func, deps, _ = self.nodes[name]
+        value = func(*[self.get(d) for d in deps])
+        digest = output_hash(value)
+        self._values[name] = value
+        self.computed.append(name)
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            value_path, hash_path = self._paths(name, key)
+            with open(value_path + '.tmp', 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(value_path + '.tmp', value_path)
+            with open(hash_path, 'w') as f:
+                f.write(digest)
+        return digest
+
+    def get(self, name):
+        """Value of ``name``, evaluating or loading only what it depends on."""
+        key, _ = self._resolve(name)
+        if name not in self._values:
+            with open(self._paths(name, key)[0], 'rb') as f:
+                self._values[name] = pickle.load(f)
+        return self._values[name]
+
+    def reset(self):
+        """Forget in-memory state so the next ``get`` re-checks inputs."""
+        self.computed = []
+        self._resolved = {}
+        self._values = {}
+        self._helper_hashes = {}
+
+
+def build_graph(path=DATA_FILE, cache_dir=CACHE_DIR, top_n=10):
+    graph = AnalysisGraph(cache_dir, params={'top_n': top_n})
+
+    @graph.node(name='raw', source=path)
+    def raw():
+        return pd.read_csv(path, encoding=ENCODING)
+
+    @graph.node('raw')
+    def tracks(raw):
+        tracks = raw.copy()
+        tracks['streams'] = pd.to_numeric(tracks['streams'], errors='coerce')
+        tracks['release_date'] = build_release_dates(tracks['released_year'], tracks['released_month'],
+                                                     tracks['released_day'])
+        tracks['spotify_total'] = tracks['in_spotify_playlists'] + tracks['in_spotify_charts']
+        tracks['apple_total'] = tracks['in_apple_playlists'] + tracks['in_apple_charts']
+        return tracks
+
+    @graph.node('tracks')
+    def playlist_columns(tracks):
+        return tracks[['track_name', 'artist(s)_name', 'in_spotify_playlists', 'in_spotify_charts',
+                       'in_apple_playlists', 'in_apple_charts', 'spotify_total', 'apple_total']]
+
+    @graph.node('tracks')
+    def stream_columns(tracks):
+        return tracks[['artist(s)_name', 'streams']]
+
+    @graph.node('tracks')
+    def temporal_columns(tracks):
+        return tracks[['release_date'] + TEMPORAL_COLUMNS]
+
+    @graph.node('raw')
+    def basic_stats(raw):
+        return {'summary': raw.describe(include='all'), 'missing_values': raw.isnull().sum()}
+
+    @graph.node('playlist_columns')
+    def top_songs(playlist_columns):
+        return playlist_columns.nlargest(top_n, 'in_spotify_playlists')[
+            ['track_name', 'artist(s)_name', 'in_spotify_playlists']]
+
+    @graph.node('stream_columns')
+    def top_artists(stream_columns):
+        return stream_columns.groupby('artist(s)_name')['streams'].sum().nlargest(top_n)
+
+    @graph.node('temporal_columns')
+    def temporal_trends(temporal_columns):
+        summary = temporal_summary(temporal_columns, 'year', dates=temporal_columns['release_date'])
+        return {'yearly_releases': summary['releases'], 'yearly_averages': summary[TEMPORAL_COLUMNS]}
+
+    @graph.node('playlist_columns')
+    def platform_comparison(playlist_columns):
+        columns = ['track_name', 'artist(s)_name']
+        return {
+            'total_counts': pd.Series({'Spotify': playlist_columns['spotify_total'].sum(),
+                                       'Apple Music': playlist_columns['apple_total'].sum()}),
+            'top_songs_spotify': playlist_columns.nlargest(top_n, 'spotify_total')[columns + ['spotify_total']],
+            'top_songs_apple': playlist_columns.nlargest(top_n, 'apple_total')[columns + ['apple_total']],
+        }
+
+    @graph.node('stream_columns', 'playlist_columns')
+    def collaborations(stream_columns, playlist_columns):
+        from collaborations import CollaborationGraph
+
+        artists = stream_columns['artist(s)_name']
+        is_collab = artists.str.contains(', ', regex=False).to_numpy()
+        presence = playlist_columns['spotify_total']
+        return {
+            'frequent_collaborators': CollaborationGraph.from_tracks(artists).top_pairs(top_n),
+            'average_streams': pd.Series({'Collaborations': stream_columns['streams'][is_collab].mean(),
+                                          'Overall': stream_columns['streams'].mean()}),
+            'average_spotify_presence': pd.Series({'Collaborations': presence[is_collab].mean(),
+                                                   'Overall': presence.mean()}),
+        }
+
+    return graph
+
+
+SECTIONS = ['basic_stats', 'top_songs', 'top_artists', 'temporal_trends', 'platform_comparison', 'collaborations']
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate Spotify analysis sections through the memoized graph.")
+    parser.add_argument('sections', nargs='*', default=SECTIONS, help="nodes to evaluate (default: all sections)")
+    parser.add_argument('--data', default=DATA_FILE)
+    parser.add_argument('--no-cache', action='store_true', help="keep results in memory only")
+    args = parser.parse_args()
+
+    graph = build_graph(args.data, None if args.no_cache else CACHE_DIR)
+    for section in args.sections:
+        value = graph.get(section)
+        print(f"== {section}")
+        for k, v in (value.items() if isinstance(value, dict) else [(None, value)]):
+            if k is not None:
+                print(f"-- {k}")
+            print(v, end='\n\n')
+    print("computed:", ', '.join(graph.computed) or 'nothing (all cached)')
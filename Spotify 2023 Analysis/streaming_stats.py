@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""Chunked Spotify track analytics with mergeable partial aggregates.
+
+Computes the same outputs as sections 2, 4, 5 and 8 of
+spotify_2023_analysis.py - summary statistics, missing-value counts, the top
+songs by ``in_spotify_playlists``, the top artists by total streams and the
+yearly averages - while reading the CSV chunk by chunk. Memory is bounded by
+the number of groups (artists, years, distinct text values) and the sketch
+sizes, not by the number of rows.
+
+Every chunk produces a ``TrackAggregate``; aggregates are merged with
+``merge``, so chunks can also be processed in a pool of worker processes::
+
+    agg = stream_spotify_csv(DATA_FILE, chunksize=100_000, processes=4)
+    agg.top_artists_by_streams(10)
+
+Count columns are read with ``thousands=','`` and ``streams`` is coerced to
+numbers, as the notebook does before section 5. Missing values are counted
+before coercion, so they match ``spotify_data.isnull().sum()``.
+"""
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'spotify-2023.csv')
+ENCODING = 'ISO-8859-1'
+
+TEXT_COLUMNS = ['track_name', 'artist(s)_name', 'key', 'mode']
+YEARLY_COLUMNS = ['streams', 'danceability_%', 'energy_%']
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch (a simplified KLL compactor hierarchy).
+
+    Level ``h`` holds items of weight ``2 ** h``; a level that grows beyond
+    ``k`` items is sorted and every other item is promoted. Quantiles are
+    exact (and interpolated like pandas) while fewer than ``k`` values were
+    seen, and have rank error of roughly ``1 / k`` afterwards.
+    """
+
+    def __init__(self, k=1024, seed=None):
+        self.k = k
+        self.count = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        self.count += other.count
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self._compress()
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            while len(items) > self.k:
+                items = np.sort(items)
+                even = len(items) - len(items) % 2
+                promoted = items[self._rng.integers(2):even:2]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                items = items[even:]
+            self.levels[h] = items
+            h += 1
+
+    def quantile(self, q):
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan)
+        if len(self.levels) == 1:
+            return np.quantile(self.levels[0], q)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(x), 2.0 ** h) for h, x in enumerate(self.levels)])
+        order = np.argsort(items)
+        cumulative = np.cumsum(weights[order])
+        ranks = np.asarray(q) * cumulative[-1]
+        return items[order][np.minimum(np.searchsorted(cumulative, ranks), len(items) - 1)]
+
+
+class TrackAggregate:
+    """Partial aggregate over any number of rows of the Spotify chart CSV."""
+
+    def __init__(self, top_n=10, quantiles=(0.25, 0.5, 0.75), sketch_size=1024):
+        self.top_n = top_n
+        self.quantiles = tuple(quantiles)
+        self.sketch_size = sketch_size
+        self.rows = 0
+        self.missing = None
+        self.numeric = {}       # column -> [count, mean, M2, min, max]
+        self.sketches = {}      # column -> QuantileSketch
+        self.text_counts = {}   # column -> value counts Series
+        self.top_songs = []     # min-heap of (in_spotify_playlists, -row, track_name, artist)
+        self.artist_streams = pd.Series(dtype=float)
+        self.yearly = pd.DataFrame()  # sums and counts per year
+
+    def update(self, chunk, first_row=0):
+        """Fold one raw chunk (as read by ``pd.read_csv``) into the aggregate."""
+        missing = chunk.isnull().sum()
+        self.missing = missing if self.missing is None else self.missing.add(missing, fill_value=0)
+        self.rows += len(chunk)
+
+        chunk = chunk.copy()
+        chunk['streams'] = pd.to_numeric(chunk['streams'], errors='coerce')
+
+        for column in chunk.columns:
+            if column in TEXT_COLUMNS:
+                self._merge_text(column, chunk[column].value_counts())
+                continue
+            values = pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=float)
+            values = values[~np.isnan(values)]
+            if len(values):
+                centered = values - values.mean()
+                self._merge_moments(column, [len(values), values.mean(), centered @ centered,
+                                             values.min(), values.max()])
+                sketch = QuantileSketch(self.sketch_size)
+                sketch.update(values)
+                self._merge_sketch(column, sketch)
+
+        playlists = pd.to_numeric(chunk['in_spotify_playlists'], errors='coerce').to_numpy(dtype=float)
+        # Rows without a playlist count never rank, as with ``nlargest``
+        present = np.flatnonzero(~np.isnan(playlists))
+        candidates = present[np.argsort(-playlists[present], kind='stable')[:self.top_n]]
+        for i in candidates:
+            self._push_song((int(playlists[i]), -(first_row + int(i)), chunk['track_name'].iat[i],
+                             chunk['artist(s)_name'].iat[i]))
+
+        streams = chunk.groupby('artist(s)_name')['streams'].sum()
+        self.artist_streams = self.artist_streams.add(streams, fill_value=0)
+
+        dates = pd.to_datetime(pd.DataFrame({'year': chunk['released_year'], 'month': chunk['released_month'],
+                                             'day': chunk['released_day']}), errors='coerce')
+        grouped = chunk[YEARLY_COLUMNS].groupby(dates.dt.year)
+        partial = grouped.sum().join(grouped.count(), rsuffix='__count')
+        self.yearly = partial if self.yearly.empty else self.yearly.add(partial, fill_value=0)
+        return self
+
+    def _merge_moments(self, column, other):
+        if column not in self.numeric:
+            self.numeric[column] = other
+            return
+        n1, mean1, m1, lo1, hi1 = self.numeric[column]
+        n2, mean2, m2, lo2, hi2 = other
+        n = n1 + n2
+        delta = mean2 - mean1
+        self.numeric[column] = [n, mean1 + delta * n2 / n, m1 + m2 + delta * delta * n1 * n2 / n,
+                                min(lo1, lo2), max(hi1, hi2)]
+
+    def _merge_sketch(self, column, sketch):
+        if column in self.sketches:
+            self.sketches[column].merge(sketch)
+        else:
+            self.sketches[column] = sketch
+
+    def _merge_text(self, column, counts):
+        if column in self.text_counts:
+            counts = self.text_counts[column].add(counts, fill_value=0)
+        self.text_counts[column] = counts
+
+    def _push_song(self, item):
+        if len(self.top_songs) < self.top_n:
+            heapq.heappush(self.top_songs, item)
+        elif item > self.top_songs[0]:
+            heapq.heapreplace(self.top_songs, item)
+
+    def merge(self, other):
+        """Combine another partial aggregate into this one."""
+        self.rows += other.rows
+        if other.missing is not None:
+            self.missing = other.missing if self.missing is None else self.missing.add(other.missing, fill_value=0)
+        for column, moments in other.numeric.items():
+            self._merge_moments(column, moments)
+        for column, sketch in other.sketches.items():
+            self._merge_sketch(column, sketch)
+        for column, counts in other.text_counts.items():
+            self._merge_text(column, counts)
+        for item in other.top_songs:
+            self._push_song(item)
+        self.artist_streams = self.artist_streams.add(other.artist_streams, fill_value=0)
+        if not other.yearly.empty:
+            self.yearly = other.yearly if self.yearly.empty else self.yearly.add(other.yearly, fill_value=0)
+        return self
+
+    def missing_values(self):
+        return self.missing.astype(int)
+
+    def summary(self):
+        """``describe(include='all')``-style table: count/mean/std/min/quantiles/max
+        for numeric columns and count/unique/top/freq for text columns."""
+        labels = ['%g%%' % (q * 100) for q in self.quantiles]
+        table = {}
+        for column, (n, mean, m2, lo, hi) in self.numeric.items():
+            stats = {'count': n, 'mean': mean, 'std': np.sqrt(m2 / (n - 1)) if n > 1 else np.nan, 'min': lo}
+            stats.update(zip(labels, self.sketches[column].quantile(self.quantiles)))
+            stats['max'] = hi
+            table[column] = stats
+        for column, counts in self.text_counts.items():
+            table[column] = {'count': counts.sum(), 'unique': len(counts),
+                             'top': counts.idxmax() if len(counts) else np.nan,
+                             'freq': counts.max() if len(counts) else np.nan}
+        order = ['count', 'unique', 'top', 'freq', 'mean', 'std', 'min'] + labels + ['max']
+        return pd.DataFrame(table).reindex(order)
+
+    def top_songs_in_playlists(self, n=None):
+        items = sorted(self.top_songs, reverse=True)[:n or self.top_n]
+        return pd.DataFrame([(name, artist, playlists) for playlists, _, name, artist in items],
+                            columns=['track_name', 'artist(s)_name', 'in_spotify_playlists'])
+
+    def top_artists_by_streams(self, n=10):
+        return self.artist_streams.nlargest(n)
+
+    def yearly_averages(self):
+        counts = self.yearly[[c + '__count' for c in YEARLY_COLUMNS]].to_numpy()
+        means = self.yearly[YEARLY_COLUMNS] / counts
+        means.index = means.index.astype(int)
+        means.index.name = 'release_date'
+        return means.sort_index()
+
+
+def _aggregate_chunk(args):
+    chunk, first_row, options = args
+    return TrackAggregate(**options).update(chunk, first_row)
+
+
+def read_chunks(path=DATA_FILE, chunksize=100_000):
+    """Raw CSV chunks with the notebook's encoding and thousands separators parsed."""
+    return pd.read_csv(path, encoding=ENCODING, thousands=',', chunksize=chunksize)
+
+
+def stream_spotify_csv(path=DATA_FILE, chunksize=100_000, processes=1, top_n=10,
+                       quantiles=(0.25, 0.5, 0.75), sketch_size=1024):
+    """Aggregate the whole CSV chunk by chunk, optionally across processes."""
+    options = {'top_n': top_n, 'quantiles': quantiles, 'sketch_size': sketch_size}
+    result = TrackAggregate(**options)
+
+    def tasks():
+        first_row = 0
+        for chunk in read_chunks(path, chunksize):
+            yield chunk, first_row, options
+            first_row += len(chunk)
+
+    if processes == 1:
+        for task in tasks():
+            result.merge(_aggregate_chunk(task))
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            for partial in pool.map(_aggregate_chunk, tasks()):
+                result.merge(partial)
+    return result
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Chunked Spotify chart analytics.")
+    parser.add_argument('path', nargs='?', default=DATA_FILE)
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    agg = stream_spotify_csv(args.path, args.chunksize, args.processes, args.top)
+    pd.set_option('display.width', 200)
+    print(agg.summary(), end='\n\n')
+    print(agg.missing_values()[lambda s: s > 0], end='\n\n')
+    print(agg.top_songs_in_playlists(), end='\n\n')
+    print(agg.top_artists_by_streams(args.top), end='\n\n')
+    print(agg.yearly_averages())
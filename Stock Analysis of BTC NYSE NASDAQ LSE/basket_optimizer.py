@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Minimum-volatility and maximum-Sharpe portfolios for every k-of-n basket.
+
+Comparing how diversification pays off across baskets means thousands of
+solves on the same return history. ``optimize_baskets`` estimates the
+annualised mean return and sample covariance of the full universe once
+(both are computed column by column or pair by pair, so the slice for a
+basket equals estimating it on its own). It hands them to every worker
+process once through the pool initializer. Each task then only carries basket
+indices; the k x k sub-covariance is gathered in the worker and solved with
+one ``FrontierSolver`` per basket size, warm-started from the previous basket.
+
+Results are written as JSON lines while the pool works, in basket order::
+
+    python basket_optimizer.py --sizes 2 3 --processes 4 -o baskets.jsonl
+    python basket_optimizer.py --benchmark --assets 12 --sizes 4
+"""
+
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from math import comb
+
+import numpy as np
+
+from portfolio_analytics import DATA_FILE, estimate_inputs, load_prices
+
+_inputs = {}
+
+
+def iter_baskets(n_assets, sizes):
+    """Index tuples of every basket with a size in ``sizes``, smallest first."""
+    for k in sorted(set(sizes)):
+        yield from itertools.combinations(range(n_assets), k)
+
+
+def clean_weights(weights, cutoff=1e-4, rounding=5):
+    """Zero weights below ``cutoff`` and round, like ``EfficientFrontier.clean_weights``."""
+    weights = np.where(np.abs(weights) < cutoff, 0.0, weights)
+    return np.round(weights, rounding)
+
+
+def _portfolio(record, assets):
+    if not np.isfinite(record['volatility']):
+        return None
+    return {
+        'weights': dict(zip(assets, clean_weights(record['weights']).tolist())),
+        'expected_return': float(record['return']),
+        'volatility': float(record['volatility']),
+        'sharpe': float(record['sharpe']),
+    }
+
+
+def _init_worker(assets, mu, S, risk_free_rate, weight_bounds, solver):
+    _inputs.update(assets=assets, mu=mu, S=S, risk_free_rate=risk_free_rate, weight_bounds=weight_bounds,
+                   solver=solver, solvers={})
+
+
+def _solve_baskets(baskets):
+    from frontier import FrontierSolver
+
+    assets, mu, S, rf = _inputs['assets'], _inputs['mu'], _inputs['S'], _inputs['risk_free_rate']
+    records = []
+    for basket in baskets:
+        k = len(basket)
+        if k not in _inputs['solvers']:
+            _inputs['solvers'][k] = FrontierSolver(k, _inputs['weight_bounds'], _inputs['solver'])
+        index = np.asarray(basket)
+        names = [assets[i] for i in basket]
+        frontier = _inputs['solvers'][k].sweep(mu[index], S[np.ix_(index, index)], n_points=0,
+                                               risk_free_rates=[rf], frontier_risk_free_rate=rf, assets=names)
+        records.append({
+            'assets': names,
+            'min_volatility': _portfolio(frontier.min_volatility[0], names),
+            'max_sharpe': _portfolio(frontier.max_sharpe[0], names),
+        })
+    return records
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def optimize_baskets(mu, S, sizes, risk_free_rate=0.0, processes=None, batch_size=64, weight_bounds=(0, 1),
+                     solver=None):
+    """Yield one record per basket: its assets and both optimal portfolios.
+
+    ``mu`` and ``S`` are the full-universe estimates (pandas or NumPy with
+    ``assets`` taken from the index). Baskets go to the workers in batches
+    of ``batch_size``; at most ``2 * processes`` batches are in flight, so
+    memory stays flat however many baskets there are.
+    """
+    assets = [str(a) for a in getattr(mu, 'index', range(len(mu)))]
+    mu = np.asarray(mu, dtype=float)
+    S = np.asarray(S, dtype=float)
+    batches = _batches(iter_baskets(len(assets), sizes), batch_size)
+    init = (assets, mu, S, risk_free_rate, weight_bounds, solver)
+
+    if processes == 1:
+        _init_worker(*init)
+        for batch in batches:
+            yield from _solve_baskets(batch)
+        return
+    processes = processes or os.cpu_count()
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=init) as pool:
+        pending = []
+        for batch in batches:
+            pending.append(pool.submit(_solve_baskets, batch))
+            if len(pending) >= 2 * processes:
+                yield from pending.pop(0).result()
+        for future in pending:
+            yield from future.result()
+
+
+def write_baskets(records, path):
+    """Stream records to a JSON lines file (``'-'`` for stdout); returns the count."""
+    out = sys.stdout if path == '-' else open(path, 'w')
+    count = 0
+    try:
+        for record in records:
+            out.write(json.dumps(record) + '\n')
+            count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return count
+
+
+def benchmark(n_assets=12, sizes=(4,), processes=None, reference_limit=50, seed=0):
+    """Solves per second of the batch optimizer against a fresh
+    ``EfficientFrontier`` per basket and objective."""
+    from portfolio_analytics import optimize_portfolio
+
+    rng = np.random.default_rng(seed)
+    a = rng.normal(size=(n_assets * 4, n_assets))
+    mu = rng.normal(0.08, 0.05, n_assets)
+    S = a.T @ a / len(a) * 0.05
+    n_baskets = sum(comb(n_assets, k) for k in sizes)
+
+    start = time.perf_counter()
+    count = sum(1 for _ in optimize_baskets(mu, S, sizes, processes=processes))
+    batched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    baskets = list(itertools.islice(iter_baskets(n_assets, sizes), reference_limit))
+    for basket in baskets:
+        index = np.asarray(basket)
+        sub_mu, sub_S = mu[index], S[np.ix_(index, index)]
+        optimize_portfolio(sub_mu, sub_S, 'min_volatility')
+        if sub_mu.max() > 0:
+            optimize_portfolio(sub_mu, sub_S, 'max_sharpe')
+    fresh = time.perf_counter() - start
+
+    print(f"{n_baskets:,} baskets of sizes {list(sizes)} from {n_assets} assets, 2 solves each")
+    print(f"  optimize_baskets ({processes or os.cpu_count()} processes): {batched:8.3f}s "
+          f"({2 * count / batched:,.0f} solves/s)")
+    print(f"  fresh EfficientFrontier ({len(baskets)} baskets):   {fresh:8.3f}s "
+          f"({2 * len(baskets) / fresh:,.0f} solves/s)")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Optimal portfolios for every k-of-n asset basket.")
+    parser.add_argument('path', nargs='?', default=DATA_FILE, help="price CSV (default: the bundled data file)")
+    parser.add_argument('--assets', help="comma-separated asset columns (default: all price columns); "
+                                         "with --benchmark, the number of synthetic assets")
+    parser.add_argument('--sizes', type=int, nargs='+', default=None, help="basket sizes (default: 2..n)")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--risk-free-rate', type=float, default=0.0)
+    parser.add_argument('--frequency', type=int, default=252, help="trading days per year")
+    parser.add_argument('--batch-size', type=int, default=64, help="baskets per worker task")
+    parser.add_argument('--output', '-o', default='-', help="JSON lines output file (default: stdout)")
+    parser.add_argument('--benchmark', action='store_true', help="time synthetic baskets instead")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        benchmark(int(args.assets or 12), args.sizes or (4,), args.processes)
+        return 0
+
+    prices = load_prices(args.path, args.assets.split(',') if args.assets else None)
+    mu, S = estimate_inputs(prices, frequency=args.frequency)
+    sizes = args.sizes or range(2, len(mu) + 1)
+    start = time.perf_counter()
+    count = write_baskets(optimize_baskets(mu, S, sizes, args.risk_free_rate, args.processes, args.batch_size),
+                          args.output)
+    elapsed = time.perf_counter() - start
+    print(f"{count} baskets in {elapsed:.2f}s ({2 * count / elapsed:,.0f} solves/s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
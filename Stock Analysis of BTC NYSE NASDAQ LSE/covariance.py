@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""Covariance estimators on a NumPy returns block, and cached factorizations.
+
+The notebook only uses ``risk_models.sample_cov(df)``, which gets noisy and
+ill-conditioned as the number of assets approaches the number of days. The
+estimators here work on a ``(days, assets)`` returns array (for example
+``MmapPrices.returns_block``) or frame, and return annualised matrices.
+Frames give frames back, labelled like pypfopt's:
+
+- ``sample_cov``: pypfopt's ``sample_cov`` on complete rows,
+- ``ledoit_wolf``: shrinkage towards a scaled identity, as
+  ``CovarianceShrinkage(...).ledoit_wolf()``,
+- ``ewma_cov``: pypfopt's ``exp_cov`` in closed form instead of a pandas
+  ``ewm`` per asset pair,
+- ``factor_cov``: ``B F B' + D`` from statistical (principal component) or
+  given factor returns.
+
+``factorize`` returns a ``FactoredCovariance`` whose Cholesky and eigen
+decompositions are computed on first use. Recent matrices are memoised by
+content, so the frontier solver, random portfolios and risk calls that get
+the same matrix share one factorization instead of decomposing it again.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CACHE_SIZE = 32
+
+_factorizations = OrderedDict()
+
+
+def _block(returns):
+    assets = getattr(returns, 'columns', None)
+    values = np.asarray(returns, dtype=float)
+    values = values[~np.isnan(values).any(axis=1)]
+    return values, assets
+
+
+def _annualised(S, assets, frequency):
+    S = S * frequency
+    if assets is None:
+        return S
+    return pd.DataFrame(S, index=assets, columns=assets)
+
+
+def sample_cov(returns, frequency=252):
+    """Annualised sample covariance (``ddof=1``) of the complete rows."""
+    X, assets = _block(returns)
+    X = X - X.mean(axis=0)
+    return _annualised(X.T @ X / (len(X) - 1), assets, frequency)
+
+
+def ledoit_wolf(returns, frequency=252, return_shrinkage=False):
+    """Ledoit-Wolf shrinkage of the (biased) sample covariance towards
+    ``trace(S) / n * I``. With ``return_shrinkage`` the shrinkage intensity
+    is returned as well."""
+    X, assets = _block(returns)
+    n_days, n_assets = X.shape
+    X = X - X.mean(axis=0)
+    S = X.T @ X / n_days
+    X2 = X ** 2
+    variances = X2.sum(axis=0) / n_days
+    mu = variances.sum() / n_assets
+
+    delta = (S ** 2).sum()
+    beta = ((X2.T @ X2).sum() / n_days - delta) / (n_assets * n_days)
+    delta = (delta - 2 * mu * variances.sum() + n_assets * mu ** 2) / n_assets
+    shrinkage = 0.0 if beta <= 0 else min(beta, delta) / delta
+
+    shrunk = (1 - shrinkage) * S
+    shrunk.flat[::n_assets + 1] += shrinkage * mu
+    shrunk = _annualised(shrunk, assets, frequency)
+    return (shrunk, shrinkage) if return_shrinkage else shrunk
+
+
+def ewma_cov(returns, span=180, frequency=252):
+    """Exponentially weighted covariance with weights ``(1 - alpha) ** age``,
+    ``alpha = 2 / (span + 1)``, of returns demeaned by their plain mean."""
+    X, assets = _block(returns)
+    X = X - X.mean(axis=0)
+    alpha = 2.0 / (span + 1.0)
+    weights = (1 - alpha) ** np.arange(len(X) - 1, -1, -1)
+    weights /= weights.sum()
+    return _annualised((X * weights[:, None]).T @ X, assets, frequency)
+
+
+def factor_cov(returns, n_factors=1, factor_returns=None, frequency=252):
+    """Factor-model covariance ``B F B' + D``.
+
+    Without ``factor_returns`` the factors are the ``n_factors`` leading
+    principal components of the sample covariance and ``D`` the remaining
+    diagonal. Otherwise each asset is regressed on the given
+    ``(days, factors)`` block, ``F`` is the factors' covariance and ``D`` the
+    residual variances.
+    """
+    X, assets = _block(returns)
+    X = X - X.mean(axis=0)
+    n_days, n_assets = X.shape
+    if factor_returns is None:
+        S = X.T @ X / (n_days - 1)
+        vals, vecs = np.linalg.eigh(S)
+        top = vecs[:, -n_factors:] * np.sqrt(np.clip(vals[-n_factors:], 0.0, None))
+        S_f = top @ top.T
+        S_f.flat[::n_assets + 1] += np.clip(np.diag(S) - np.diag(S_f), 0.0, None)
+    else:
+        F = np.asarray(factor_returns, dtype=float).reshape(n_days, -1)
+        F = F - F.mean(axis=0)
+        B, *_ = np.linalg.lstsq(F, X, rcond=None)
+        residuals = X - F @ B
+        S_f = B.T @ (F.T @ F / (n_days - 1)) @ B
+        S_f.flat[::n_assets + 1] += (residuals ** 2).sum(axis=0) / (n_days - 1 - F.shape[1])
+    return _annualised(S_f, assets, frequency)
+
+
+ESTIMATORS = {
+    'sample': sample_cov,
+    'ledoit_wolf': ledoit_wolf,
+    'ewma': ewma_cov,
+    'factor': factor_cov,
+}
+
+
+class FactoredCovariance:
+    """A covariance matrix with lazily computed, memoised factorizations."""
+
+    def __init__(self, S):
+        self.matrix = np.array(S, dtype=float)
+        self._cholesky = None
+        self._eigh = None
+
+    @property
+    def cholesky(self):
+        """Lower Cholesky factor, or ``None`` if the matrix is not positive definite."""
+        if self._cholesky is None:
+            try:
+                self._cholesky = np.linalg.cholesky(self.matrix)
+            except np.linalg.LinAlgError:
+                self._cholesky = False
+        return self._cholesky if self._cholesky is not False else None
+
+    @property
+    def eigh(self):
+        """Ascending eigenvalues and eigenvectors."""
+        if self._eigh is None:
+            self._eigh = np.linalg.eigh(self.matrix)
+        return self._eigh
+
+    @property
+    def factor(self):
+        """``F`` with ``F @ F.T == S``; Cholesky, or an eigen square root
+        when ``S`` is only positive semi-definite."""
+        if self.cholesky is not None:
+            return self.cholesky
+        vals, vecs = self.eigh
+        return vecs * np.sqrt(np.clip(vals, 0.0, None))
+
+    @property
+    def condition_number(self):
+        vals = self.eigh[0]
+        return vals[-1] / vals[0] if vals[0] > 0 else np.inf
+
+    def variance(self, weights):
+        """``w @ S @ w`` for a weight vector or for every row of a weight matrix."""
+        projected = np.asarray(weights, dtype=float) @ self.factor
+        return np.einsum('...i,...i->...', projected, projected)
+
+    def solve(self, b):
+        """``S^-1 b`` from the cached factorization (pseudo-inverse when singular)."""
+        if self.cholesky is not None:
+            return np.linalg.solve(self.cholesky.T, np.linalg.solve(self.cholesky, b))
+        vals, vecs = self.eigh
+        inverse = np.where(vals > vals[-1] * 1e-12, 1.0 / np.where(vals > 0, vals, 1.0), 0.0)
+        return vecs @ (inverse[:, None] * (vecs.T @ np.reshape(b, (len(vals), -1)))).reshape(np.shape(b))
+
+
+def factorize(S):
+    """``FactoredCovariance`` of ``S``, shared by calls with an equal matrix."""
+    S = np.ascontiguousarray(S, dtype=float)
+    key = hashlib.sha1(S.tobytes()).hexdigest() + str(S.shape)
+    cached = _factorizations.get(key)
+    if cached is None:
+        cached = _factorizations[key] = FactoredCovariance(S)
+        if len(_factorizations) > CACHE_SIZE:
+            _factorizations.popitem(last=False)
+    else:
+        _factorizations.move_to_end(key)
+    return cached
+
+
+def benchmark(n_days=1382, n_assets=(4, 100, 1000), seed=0):
+    """Time the NumPy estimators against pypfopt on synthetic returns."""
+    import time
+    import warnings
+
+    from pypfopt import risk_models
+
+    rng = np.random.default_rng(seed)
+    for n in n_assets:
+        returns = pd.DataFrame(rng.normal(0.0005, 0.01, size=(n_days, n)))
+        rows = []
+        for name, ours, theirs in [
+            ('sample', sample_cov, lambda r: risk_models.sample_cov(r, returns_data=True)),
+            ('ledoit_wolf', ledoit_wolf,
+             lambda r: risk_models.CovarianceShrinkage(r, returns_data=True).ledoit_wolf()),
+            ('ewma', ewma_cov, lambda r: risk_models.exp_cov(r, returns_data=True)),
+        ]:
+            if name == 'ewma' and n > 100:
+                rows.append((name, None, None, None))
+                continue
+            start = time.perf_counter()
+            ours_value = ours(returns)
+            mid = time.perf_counter()
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                theirs_value = theirs(returns)
+            end = time.perf_counter()
+            rows.append((name, mid - start, end - mid, np.abs(np.asarray(ours_value) - np.asarray(theirs_value)).max()))
+        print(f"{n} assets, {n_days} days")
+        for name, ours_time, theirs_time, diff in rows:
+            if ours_time is None:
+                print(f"  {name:<12} (pypfopt's pairwise loop skipped)")
+            else:
+                print(f"  {name:<12} numpy {ours_time:8.4f}s  pypfopt {theirs_time:8.4f}s  max diff {diff:.1e}")
+
+        S = sample_cov(returns.to_numpy())
+        start = time.perf_counter()
+        factorize(S).factor
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        factorize(S).factor
+        print(f"  factorize    first {first:8.4f}s  cached {time.perf_counter() - start:8.4f}s")
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""Efficient-frontier sweep with one reusable, warm-started problem setup.
+
+The notebook builds a fresh ``EfficientFrontier(mu, S)`` for the minimum
+volatility portfolio, the maximum Sharpe portfolio and the plot, and
+``plotting.plot_efficient_frontier`` re-solves from scratch for every target
+return. ``FrontierSolver`` instead builds three parametrised CVXPY problems
+once per asset count:
+
+- minimum volatility,
+- minimum volatility for a target return (``target`` is a parameter),
+- maximum Sharpe ratio in the usual ``y = w / k`` form (``risk_free_rate`` is
+  a parameter).
+
+Expected returns and a square-root factor of the covariance are parameters
+too, so the same solver serves any number of universes of the same size
+without re-canonicalising, and each solve is warm-started from the previous
+(neighbouring) solution.
+
+Run ``python frontier.py`` to compare against one ``EfficientFrontier`` per
+frontier point.
+"""
+
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from covariance import factorize
+
+
+def covariance_factor(S):
+    """Return ``F`` with ``F @ F.T == S``; Cholesky, or an eigen square root
+    when ``S`` is only positive semi-definite. Shared with every other
+    caller of ``covariance.factorize`` on the same matrix."""
+    return factorize(S).factor
+
+
+def _record_dtype(n_assets, extra=()):
+    return np.dtype(list(extra) + [('return', 'f8'), ('volatility', 'f8'), ('sharpe', 'f8'),
+                                   ('weights', 'f8', (n_assets,))])
+
+
+@dataclass
+class Frontier:
+    """Result of a sweep.
+
+    ``points``, ``min_volatility`` and ``max_sharpe`` are structured arrays
+    with ``return``, ``volatility``, ``sharpe`` and ``weights`` fields;
+    ``max_sharpe`` also has a ``risk_free_rate`` field, one row per rate.
+    Infeasible solves are left as NaN.
+    """
+    assets: list
+    points: np.ndarray
+    min_volatility: np.ndarray
+    max_sharpe: np.ndarray
+
+
+class FrontierSolver:
+    """Parametrised frontier problems for universes of ``n_assets`` assets."""
+
+    def __init__(self, n_assets, weight_bounds=(0, 1), solver=None):
+        import cvxpy as cp
+
+        self.n_assets = n_assets
+        self.lower, self.upper = weight_bounds
+        self.solver = solver
+
+        self.mu = cp.Parameter(n_assets)
+        self.factor = cp.Parameter((n_assets, n_assets))
+        self.target = cp.Parameter()
+        self.risk_free_rate = cp.Parameter()
+
+        self.w = cp.Variable(n_assets)
+        risk = cp.sum_squares(self.factor.T @ self.w)
+        budget = [cp.sum(self.w) == 1, self.w >= self.lower, self.w <= self.upper]
+        self.min_vol_problem = cp.Problem(cp.Minimize(risk), budget)
+        self.target_problem = cp.Problem(cp.Minimize(risk), budget + [self.mu @ self.w >= self.target])
+
+        self.y = cp.Variable(n_assets)
+        self.k = cp.Variable()
+        self.sharpe_problem = cp.Problem(cp.Minimize(cp.sum_squares(self.factor.T @ self.y)), [
+            self.mu @ self.y - self.risk_free_rate * cp.sum(self.y) == 1,
+            cp.sum(self.y) == self.k,
+            self.k >= 0,
+            self.y >= self.lower * self.k,
+            self.y <= self.upper * self.k,
+        ])
+
+    def _solve(self, problem):
+        try:
+            problem.solve(solver=self.solver, warm_start=True)
+        except Exception:
+            return False
+        return problem.status in ('optimal', 'optimal_inaccurate')
+
+    def _weights(self, w):
+        return np.clip(w, self.lower, self.upper)
+
+    def sweep(self, mu, S, n_points=50, risk_free_rates=(0.0,), frontier_risk_free_rate=0.0, assets=None):
+        """Compute the frontier at ``n_points`` target returns, the minimum
+        volatility portfolio and the maximum Sharpe portfolio for every rate in
+        ``risk_free_rates``.
+
+        Target returns run from the minimum-volatility return to the largest
+        attainable return. ``frontier_risk_free_rate`` is used for the Sharpe
+        ratios reported on the frontier points.
+        """
+        if assets is None:
+            assets = list(getattr(mu, 'index', range(self.n_assets)))
+        mu = np.asarray(mu, dtype=float)
+        S = np.asarray(S, dtype=float)
+        self.mu.value = mu
+        self.factor.value = covariance_factor(S)
+
+        def record(w, rf):
+            ret = float(mu @ w)
+            vol = float(np.sqrt(max(w @ S @ w, 0.0)))
+            return ret, vol, (ret - rf) / vol if vol > 0 else np.nan, w
+
+        empty = (np.nan, np.nan, np.nan, np.full(self.n_assets, np.nan))
+
+        min_vol = np.zeros(1, _record_dtype(self.n_assets))
+        if self._solve(self.min_vol_problem):
+            min_vol[0] = record(self._weights(self.w.value), frontier_risk_free_rate)
+        else:
+            min_vol[0] = empty
+
+        # Highest return reachable under the bounds: fill the best assets first
+        order = np.argsort(mu)[::-1]
+        remaining, top = 1.0 - self.lower * self.n_assets, self.lower * mu.sum()
+        for i in order:
+            take = min(self.upper - self.lower, remaining)
+            top += take * mu[i]
+            remaining -= take
+        start = min_vol['return'][0] if np.isfinite(min_vol['return'][0]) else mu.min()
+        targets = np.linspace(start, top - 1e-6 * max(abs(top), 1.0), n_points)
+
+        points = np.zeros(n_points, _record_dtype(self.n_assets))
+        for i, target in enumerate(targets):
+            self.target.value = target
+            if self._solve(self.target_problem):
+                points[i] = record(self._weights(self.w.value), frontier_risk_free_rate)
+            else:
+                points[i] = empty
+
+        rates = np.atleast_1d(np.asarray(risk_free_rates, dtype=float))
+        max_sharpe = np.zeros(len(rates), _record_dtype(self.n_assets, [('risk_free_rate', 'f8')]))
+        for i, rf in enumerate(rates):
+            max_sharpe[i] = (rf,) + empty
+            if mu.max() <= rf:
+                continue
+            self.risk_free_rate.value = rf
+            if self._solve(self.sharpe_problem) and self.k.value > 0:
+                max_sharpe[i] = (rf,) + record(self._weights(self.y.value / self.k.value), rf)
+
+        return Frontier(list(assets), points, min_vol, max_sharpe)
+
+
+def sweep_frontier(mu, S, n_points=50, risk_free_rates=(0.0,), frontier_risk_free_rate=0.0,
+                   weight_bounds=(0, 1), solver=None):
+    """One-off :meth:`FrontierSolver.sweep`; keep a ``FrontierSolver`` around
+    instead when sweeping many universes of the same size."""
+    return FrontierSolver(len(mu), weight_bounds, solver).sweep(
+        mu, S, n_points, risk_free_rates, frontier_risk_free_rate)
+
+
+def benchmark(n_assets=4, n_points=50, n_universes=5, seed=0):
+    """Print wall time of a reused FrontierSolver against a fresh
+    EfficientFrontier per frontier point."""
+    from pypfopt.efficient_frontier import EfficientFrontier
+
+    rng = np.random.default_rng(seed)
+    universes = []
+    for _ in range(n_universes):
+        a = rng.normal(size=(n_assets * 4, n_assets))
+        universes.append((rng.normal(0.08, 0.05, n_assets), a.T @ a / len(a) * 0.05))
+
+    start = time.perf_counter()
+    solver = FrontierSolver(n_assets)
+    frontiers = [solver.sweep(mu, S, n_points) for mu, S in universes]
+    swept = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for (mu, S), frontier in zip(universes, frontiers):
+        for target in frontier.points['return']:
+            ef = EfficientFrontier(mu, S)
+            try:
+                ef.efficient_return(target)
+            except Exception:
+                pass
+    fresh = time.perf_counter() - start
+
+    solves = n_universes * n_points
+    print(f"{n_universes} universes x {n_points} points, {n_assets} assets")
+    print(f"  FrontierSolver.sweep:           {swept:8.3f}s ({solves / swept:,.0f} solves/s)")
+    print(f"  fresh EfficientFrontier/point:  {fresh:8.3f}s ({solves / fresh:,.0f} solves/s)")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the warm-started frontier sweep.")
+    parser.add_argument('--assets', type=int, default=4)
+    parser.add_argument('--points', type=int, default=50)
+    parser.add_argument('--universes', type=int, default=5)
+    args = parser.parse_args()
+    benchmark(args.assets, args.points, args.universes)
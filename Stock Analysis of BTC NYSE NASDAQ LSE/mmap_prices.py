@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""Memory-mapped price matrix for large asset universes.
+
+``df.pct_change()``, ``df / df.iloc[0]`` and the covariance each materialise
+a full copy of the price frame, which stops fitting in RAM somewhere around
+thousands of tickers over decades. ``MmapPrices`` keeps the prices in a
+column-major ``.npy`` file on disk and computes returns, normalised series,
+mean returns and the covariance block by block, so only ``rows x block_size``
+values are in memory at a time (plus the ``assets x assets`` covariance).
+
+Missing prices are forward-filled while the matrix is built; assets without
+any price yet keep NaN and should be dropped before estimating statistics.
+
+Run ``python mmap_prices.py --help`` for the peak-RSS benchmark against the
+in-memory pandas pipeline.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+
+class MmapPrices:
+    """A read-only, memory-mapped ``(days, assets)`` price matrix."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        self.columns = meta['columns']
+        self.dates = pd.DatetimeIndex(np.load(os.path.join(directory, 'dates.npy')), name=meta['index_name'])
+        self.values = np.load(os.path.join(directory, 'prices.npy'), mmap_mode='r')
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @classmethod
+    def from_csv(cls, path, directory, date_column='Date', columns=None, dtype='float32', chunksize=100_000):
+        """Stream a wide price CSV into a memory-mapped matrix without loading it whole."""
+        header = pd.read_csv(path, nrows=0).columns
+        if columns is None:
+            columns = [c for c in header if c != date_column and not c.endswith('_Volume')]
+        n_rows = sum(len(chunk) for chunk in pd.read_csv(path, usecols=[date_column], chunksize=chunksize))
+        chunks = pd.read_csv(path, usecols=[date_column] + list(columns), parse_dates=[date_column],
+                             index_col=date_column, dtype={c: dtype for c in columns}, chunksize=chunksize)
+        return cls._write(chunks, directory, list(columns), n_rows, dtype)
+
+    @classmethod
+    def from_frame(cls, frame, directory, dtype='float32', block_rows=100_000):
+        """Copy an in-memory price frame (Date index, one column per asset) to disk."""
+        chunks = (frame.iloc[i:i + block_rows] for i in range(0, len(frame), block_rows))
+        return cls._write(chunks, directory, list(frame.columns), len(frame), dtype)
+
+    @classmethod
+    def _write(cls, chunks, directory, columns, n_rows, dtype):
+        os.makedirs(directory, exist_ok=True)
+        values = np.lib.format.open_memmap(os.path.join(directory, 'prices.npy'), mode='w+', dtype=dtype,
+                                           shape=(n_rows, len(columns)), fortran_order=True)
+        dates = np.empty(n_rows, dtype='datetime64[ns]')
+        last = np.full(len(columns), np.nan, dtype=dtype)
+        row = 0
+        index_name = None
+        for chunk in chunks:
+            block = chunk[columns].to_numpy(dtype=dtype)
+            block = pd.DataFrame(np.vstack([last, block])).ffill().to_numpy(dtype=dtype)[1:]
+            values[row:row + len(block)] = block
+            dates[row:row + len(block)] = chunk.index.values
+            last = block[-1]
+            row += len(block)
+            index_name = chunk.index.name
+        values.flush()
+        del values
+
+        np.save(os.path.join(directory, 'dates.npy'), dates)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({'columns': columns, 'index_name': index_name}, f)
+        return cls(directory)
+
+    def column_blocks(self, block_size=256):
+        """Yield ``(slice, prices)`` where ``prices`` is a zero-copy view of a column block."""
+        for start in range(0, self.shape[1], block_size):
+            cols = slice(start, min(start + block_size, self.shape[1]))
+            yield cols, self.values[:, cols]
+
+    def returns_block(self, cols):
+        """Daily simple returns (``pct_change`` without the leading NaN row) of a column block."""
+        p = np.asarray(self.values[:, cols], dtype='float64')
+        return p[1:] / p[:-1] - 1.0
+
+    def normalized_block(self, cols):
+        """Prices of a column block relative to the first day, in percent."""
+        p = np.asarray(self.values[:, cols], dtype='float64')
+        return p / p[0] * 100.0
+
+    def write_returns(self, path, block_size=256, dtype='float32'):
+        """Write the full returns matrix to a memory-mapped ``.npy`` file, block by block."""
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(self.shape[0] - 1, self.shape[1]),
+                                        fortran_order=True)
+        for cols, _ in self.column_blocks(block_size):
+            out[:, cols] = self.returns_block(cols)
+        out.flush()
+        return np.load(path, mmap_mode='r')
+
+    def mean_historical_return(self, frequency=252):
+        """Annualised compounded mean return, as ``expected_returns.mean_historical_return``."""
+        n = self.shape[0] - 1
+        first = np.asarray(self.values[0], dtype='float64')
+        last = np.asarray(self.values[-1], dtype='float64')
+        return pd.Series((last / first) ** (frequency / n) - 1, index=self.columns)
+
+    def sample_cov(self, frequency=252, block_size=256, out=None):
+        """Annualised covariance of daily returns, as ``risk_models.sample_cov``.
+
+        Column blocks are paired so each returns block is computed once per
+        outer block; ``out`` may be a preallocated (e.g. memory-mapped)
+        ``assets x assets`` array for universes whose covariance itself is large.
+        """
+        k = self.shape[1]
+        if out is None:
+            out = np.empty((k, k))
+        blocks = [cols for cols, _ in self.column_blocks(block_size)]
+        for i, rows in enumerate(blocks):
+            left = self.returns_block(rows)
+            left -= left.mean(axis=0)
+            for cols in blocks[i:]:
+                right = left if cols == rows else self.returns_block(cols)
+                if right is not left:
+                    right -= right.mean(axis=0)
+                block = left.T @ right * (frequency / (len(left) - 1))
+                out[rows, cols] = block
+                out[cols, rows] = block.T
+        return out
+
+    def sample_cov_frame(self, frequency=252, block_size=256):
+        return pd.DataFrame(self.sample_cov(frequency, block_size), index=self.columns, columns=self.columns)
+
+
+def _peak_rss_mb():
+    import resource
+    import sys
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_mode(args):
+    import time
+
+    mode, directory, block_size = args
+    prices = MmapPrices(directory)
+    start = time.perf_counter()
+    if mode == 'pandas':
+        df = pd.DataFrame(np.array(prices.values), index=prices.dates, columns=prices.columns)
+        returns = df.pct_change()
+        normalized = df / df.iloc[0] * 100
+        cov = returns.cov() * 252
+        checksum = float(cov.to_numpy().trace() + normalized.iloc[-1].sum())
+    else:
+        cov = prices.sample_cov(block_size=block_size)
+        last = sum(prices.normalized_block(cols)[-1].sum() for cols, _ in prices.column_blocks(block_size))
+        checksum = float(np.trace(cov) + last)
+    return mode, time.perf_counter() - start, _peak_rss_mb(), checksum
+
+
+def benchmark(days=5040, assets=2000, block_size=256, directory=None, seed=0):
+    """Build a synthetic ``days x assets`` matrix and report time and peak RSS of
+    the pandas pipeline and the blocked mmap pipeline, each in a fresh process."""
+    import multiprocessing
+    import tempfile
+
+    directory = directory or tempfile.mkdtemp(prefix='mmap-prices-')
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2004-01-01', periods=days)
+    out = np.lib.format.open_memmap(os.path.join(directory, 'prices.npy'), mode='w+', dtype='float32',
+                                    shape=(days, assets), fortran_order=True)
+    for cols in range(0, assets, block_size):
+        width = min(block_size, assets - cols)
+        steps = rng.normal(0.0003, 0.02, size=(days, width))
+        out[:, cols:cols + width] = 100 * np.exp(np.cumsum(steps, axis=0))
+    out.flush()
+    del out
+    np.save(os.path.join(directory, 'dates.npy'), dates.values)
+    with open(os.path.join(directory, 'meta.json'), 'w') as f:
+        json.dump({'columns': ['A%05d' % i for i in range(assets)], 'index_name': 'Date'}, f)
+
+    print(f"{days} days x {assets} assets, block size {block_size}")
+    context = multiprocessing.get_context('spawn')
+    for mode in ('pandas', 'mmap'):
+        with context.Pool(1) as pool:
+            name, seconds, peak, checksum = pool.apply(_run_mode, ((mode, directory, block_size),))
+        print(f"  {name:>6}: {seconds:8.2f}s  peak RSS {peak:10,.0f} MB  (checksum {checksum:.6g})")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Peak-RSS benchmark of the memory-mapped returns pipeline.")
+    parser.add_argument('--days', type=int, default=5040)
+    parser.add_argument('--assets', type=int, default=2000)
+    parser.add_argument('--block-size', type=int, default=256)
+    parser.add_argument('--directory', help="where to write the synthetic matrix (default: a temp folder)")
+    args = parser.parse_args()
+    benchmark(args.days, args.assets, args.block_size, args.directory)
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""Headless portfolio analytics for the BTC / NYSE / NASDAQ / LSE analysis.
+
+The notebook pipeline (load -> returns -> covariance -> minimum volatility /
+maximum Sharpe) as plain functions, plus a batch CLI that runs it over many
+price files and asset universes in a process pool::
+
+    python portfolio_analytics.py "data/btc nasdaq nyse.csv" \\
+        --universe BTC,NYSE,NASDAQ,LSE --universe NYSE,NASDAQ,LSE \\
+        --processes 8 --output results.jsonl
+
+Each (file, universe) pair produces one JSON line with the cleaned weights and
+the expected return, volatility and Sharpe ratio of both portfolios. Nothing
+is plotted unless ``--plot-dir`` is given.
+"""
+
+import json
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'btc nasdaq nyse.csv')
+DEFAULT_ASSETS = ['BTC', 'NYSE', 'NASDAQ', 'LSE']
+
+
+def load_prices(path=DATA_FILE, columns=None, date_column='Date', cache=False, cache_dir=None):
+    """Read a price CSV into a Date-indexed frame of close prices.
+
+    Without ``columns`` every column except the date and ``*_Volume`` columns
+    is treated as an asset. With ``cache=True`` the compact float32 frame from
+    ``price_cache.load_price_frame`` is used, so repeated runs skip CSV parsing.
+    """
+    if cache:
+        from price_cache import load_price_frame
+
+        data = load_price_frame(path, date_column=date_column, cache_dir=cache_dir)
+    else:
+        data = pd.read_csv(path, parse_dates=[date_column])
+        data = data.set_index(date_column)
+    if columns is None:
+        columns = [c for c in data.columns if not c.endswith('_Volume')]
+    return data[list(columns)]
+
+
+def daily_returns(prices):
+    """Daily percentage change of each asset."""
+    return prices.pct_change()
+
+
+def normalized_prices(prices):
+    """Prices relative to the first date, in percent."""
+    return prices / prices.iloc[0] * 100
+
+
+def estimate_inputs(prices, frequency=252, risk_model='sample'):
+    """Annualised mean historical return and covariance.
+
+    ``risk_model`` is ``'sample'`` (pypfopt's ``sample_cov``) or one of the
+    NumPy estimators in covariance.py: ``'ledoit_wolf'``, ``'ewma'`` or
+    ``'factor'``.
+    """
+    from pypfopt import expected_returns, risk_models
+
+    mu = expected_returns.mean_historical_return(prices, frequency=frequency)
+    if risk_model == 'sample':
+        S = risk_models.sample_cov(prices, frequency=frequency)
+    else:
+        from covariance import ESTIMATORS
+
+        if risk_model not in ESTIMATORS:
+            raise ValueError("unknown risk model %r" % risk_model)
+        S = ESTIMATORS[risk_model](daily_returns(prices), frequency=frequency)
+    return mu, S
+
+
+def optimize_portfolio(mu, S, objective='min_volatility', risk_free_rate=0.0, weight_bounds=(0, 1)):
+    """Solve one efficient-frontier objective and return weights and performance.
+
+    ``objective`` is ``'min_volatility'`` or ``'max_sharpe'``. The result is a
+    plain dict so it can be pickled across processes and written as JSON.
+    """
+    from pypfopt.efficient_frontier import EfficientFrontier
+
+    ef = EfficientFrontier(mu, S, weight_bounds=weight_bounds)
+    if objective == 'min_volatility':
+        ef.min_volatility()
+    elif objective == 'max_sharpe':
+        ef.max_sharpe(risk_free_rate=risk_free_rate)
+    else:
+        raise ValueError("unknown objective %r" % objective)
+
+    ret, vol, sharpe = ef.portfolio_performance(risk_free_rate=risk_free_rate)
+    return {
+        'weights': dict(ef.clean_weights()),
+        'expected_return': float(ret),
+        'volatility': float(vol),
+        'sharpe': float(sharpe),
+    }
+
+
+def analyze_prices(prices, risk_free_rate=0.0, frequency=252, risk_model='sample'):
+    """Run the full notebook pipeline on a price frame."""
+    returns = daily_returns(prices)
+    mu, S = estimate_inputs(prices, frequency=frequency, risk_model=risk_model)
+    return {
+        'assets': list(prices.columns),
+        'start': str(prices.index[0].date()),
+        'end': str(prices.index[-1].date()),
+        'rows': len(prices),
+        'daily_std': {k: float(v) for k, v in returns.std().items()},
+        'min_volatility': optimize_portfolio(mu, S, 'min_volatility', risk_free_rate),
+        'max_sharpe': optimize_portfolio(mu, S, 'max_sharpe', risk_free_rate),
+    }
+
+
+def plot_frontier(prices, path, risk_free_rate=0.0, n_samples=1000, frequency=252, risk_model='sample'):
+    """Save the efficient frontier with both optimal portfolios and a random
+    cloud, from the same inputs as ``analyze_prices``."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    from frontier import sweep_frontier
+    from random_portfolios import simulate_random_portfolios
+
+    mu, S = estimate_inputs(prices, frequency=frequency, risk_model=risk_model)
+    frontier = sweep_frontier(mu, S, n_points=100, risk_free_rates=[risk_free_rate],
+                              frontier_risk_free_rate=risk_free_rate)
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(frontier.points['volatility'], frontier.points['return'], label="Efficient frontier")
+    ax.set_xlabel("Volatility")
+    ax.set_ylabel("Return")
+    ax.scatter(frontier.max_sharpe['volatility'], frontier.max_sharpe['return'], marker="*", s=200, c="r", label="Max Sharpe")
+    ax.scatter(frontier.min_volatility['volatility'], frontier.min_volatility['return'], marker="*", s=200, c="blue",
+               label="Min Volatility")
+
+    cloud = simulate_random_portfolios(mu, S, n_samples)
+    ax.scatter(cloud.volatility, cloud.returns, marker=".", c=cloud.sharpe, cmap="viridis_r")
+    ax.set_title("Efficient Frontier with Random Portfolios")
+    ax.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
+
+
+def run_job(job):
+    """Analyse one ``(path, columns)`` job; errors are returned, not raised."""
+    path, columns, options = job
+    record = {'source': path, 'universe': columns}
+    try:
+        prices = load_prices(path, columns, cache=options['cache'], cache_dir=options['cache_dir'])
+        record.update(analyze_prices(prices, options['risk_free_rate'], options['frequency'], options['risk_model']))
+        if options['plot_dir']:
+            name = os.path.splitext(os.path.basename(path))[0]
+            name = '%s_%s.png' % (name, '-'.join(prices.columns))
+            record['plot'] = os.path.join(options['plot_dir'], name.replace(' ', '_'))
+            plot_frontier(prices, record['plot'], options['risk_free_rate'], frequency=options['frequency'],
+                          risk_model=options['risk_model'])
+    except Exception as exc:
+        record['error'] = '%s: %s' % (type(exc).__name__, exc)
+        record['traceback'] = traceback.format_exc()
+    return record
+
+
+def run_batch(paths, universes=None, processes=None, risk_free_rate=0.0, frequency=252, plot_dir=None,
+              cache=False, cache_dir=None, risk_model='sample'):
+    """Yield one result record per (path, universe) pair, in input order."""
+    options = {'risk_free_rate': risk_free_rate, 'frequency': frequency, 'plot_dir': plot_dir,
+               'cache': cache, 'cache_dir': cache_dir, 'risk_model': risk_model}
+    jobs = [(p, u, options) for p in paths for u in (universes or [None])]
+    if plot_dir:
+        os.makedirs(plot_dir, exist_ok=True)
+
+    if processes == 1 or len(jobs) == 1:
+        for job in jobs:
+            yield run_job(job)
+        return
+    with ProcessPoolExecutor(processes) as pool:
+        yield from pool.map(run_job, jobs, chunksize=max(1, len(jobs) // (4 * (processes or os.cpu_count()))))
+
+
+def _read_universes(values, universe_file):
+    universes = [v.split(',') for v in values or []]
+    if universe_file:
+        with open(universe_file) as f:
+            universes += [line.strip().split(',') for line in f if line.strip()]
+    return [[c.strip() for c in u] for u in universes] or None
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Minimum-volatility and maximum-Sharpe portfolios for many price files.")
+    parser.add_argument('paths', nargs='*', default=[DATA_FILE], help="price CSV files (default: the bundled data file)")
+    parser.add_argument('--universe', action='append', metavar='A,B,...',
+                        help="comma-separated asset columns; repeat for several universes (default: all price columns)")
+    parser.add_argument('--universe-file', help="file with one comma-separated universe per line")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--risk-free-rate', type=float, default=0.0)
+    parser.add_argument('--frequency', type=int, default=252, help="trading days per year")
+    parser.add_argument('--risk-model', default='sample', choices=['sample', 'ledoit_wolf', 'ewma', 'factor'],
+                        help="covariance estimator (default: sample)")
+    parser.add_argument('--output', '-o', default='-', help="JSON lines output file (default: stdout)")
+    parser.add_argument('--plot-dir', help="also save an efficient-frontier PNG per job into this folder")
+    parser.add_argument('--cache', action='store_true', help="load prices through the compact binary column cache")
+    parser.add_argument('--cache-dir', help="cache location (default: .price_cache next to each input file)")
+    args = parser.parse_args(argv)
+
+    universes = _read_universes(args.universe, args.universe_file)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w')
+    failures = 0
+    try:
+        for record in run_batch(args.paths, universes, args.processes, args.risk_free_rate,
+                                args.frequency, args.plot_dir, args.cache or bool(args.cache_dir),
+                                args.cache_dir, args.risk_model):
+            failures += 'error' in record
+            out.write(json.dumps(record) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
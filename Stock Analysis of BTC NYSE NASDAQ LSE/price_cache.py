@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Compact price/volume loading with a binary column cache.
+
+``read_price_csv`` parses the Date column while reading, stores prices as
+float32 and each ``*_Volume`` column as the smallest integer type that holds
+it exactly (float volumes such as ``LSE_Volume`` are converted when they have
+no fractional part and no missing values).
+
+``load_price_frame`` adds a cache: the compact frame is written as one
+``.npy`` file per column plus ``meta.json`` in ``.price_cache/`` next to the
+source file, under an entry for the source's absolute path and in a version
+directory named after the source's key (size and mtime, or a SHA-1 of its
+contents), so concurrent writers never replace a directory that someone else
+is reading. Later runs ``np.load`` the columns, memory-mapped by default,
+instead of parsing CSV again.
+"""
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 1
+
+
+def _downcast_volume(values):
+    if values.dtype.kind == 'f':
+        if values.isna().any() or not (values % 1 == 0).all():
+            return values
+        values = values.astype('int64')
+    return pd.to_numeric(values, downcast='unsigned' if (values >= 0).all() else 'integer')
+
+
+def read_price_csv(path, date_column='Date', downcast=True):
+    """Read a price CSV with dates parsed at read time and compact dtypes."""
+    header = pd.read_csv(path, nrows=0).columns
+    dtype = {}
+    if downcast:
+        dtype = {c: 'float32' for c in header if c != date_column and not c.endswith('_Volume')}
+    frame = pd.read_csv(path, parse_dates=[date_column], index_col=date_column, dtype=dtype)
+    if downcast:
+        for column in frame.columns:
+            if column.endswith('_Volume'):
+                frame[column] = _downcast_volume(frame[column])
+    return frame
+
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_key(path, verify='mtime'):
+    """Identify the current contents of ``path``.
+
+    ``verify='mtime'`` uses the absolute path, size and modification time (a
+    stat call); ``verify='hash'`` uses size and a hash of the contents
+    instead, so the key survives touches, and a copy of the file keeps
+    its key.
+    """
+    stat = os.stat(path)
+    key = {'size': stat.st_size, 'version': CACHE_VERSION}
+    if verify == 'hash':
+        key['sha1'] = file_hash(path)
+    elif verify == 'mtime':
+        key['path'] = os.path.abspath(path)
+        key['mtime_ns'] = stat.st_mtime_ns
+    else:
+        raise ValueError("verify must be 'mtime' or 'hash'")
+    return key
+
+
+def default_cache_dir(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), '.price_cache')
+
+
+def _entry_dir(path, cache_dir):
+    """One entry per source file: same-named files from different folders
+    that share a ``cache_dir`` must not prune each other's versions."""
+    path = os.path.abspath(path)
+    digest = hashlib.sha1(path.encode('utf-8', 'surrogateescape')).hexdigest()[:12]
+    return os.path.join(cache_dir or default_cache_dir(path), '%s-%s.cols' % (os.path.basename(path), digest))
+
+
+def _version_dir(entry, key):
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(entry, digest)
+
+
+def write_cache(frame, entry, key):
+    """Write ``frame`` as per-column ``.npy`` files into a version of ``entry``.
+
+    Every key has its own version directory, filled under a unique temporary
+    name and published with one ``rename``. If another process published the
+    same version first, its copy is kept: it holds the same data. The
+    entry's versions for other keys (older contents of the same source) are
+    then removed on a best-effort basis; memory maps of their files stay
+    valid on POSIX systems.
+    """
+    os.makedirs(entry, exist_ok=True)
+    target = _version_dir(entry, key)
+    tmp = tempfile.mkdtemp(dir=entry, prefix='.tmp-')
+    try:
+        np.save(os.path.join(tmp, '_index.npy'), frame.index.values.astype('datetime64[ns]'))
+        files = []
+        for i, column in enumerate(frame.columns):
+            name = '%03d.npy' % i
+            np.save(os.path.join(tmp, name), frame[column].to_numpy())
+            files.append(name)
+        meta = {'key': key, 'index_name': frame.index.name, 'columns': list(frame.columns), 'files': files}
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        try:
+            os.rename(tmp, target)
+        except OSError as exc:
+            if exc.errno not in (errno.EEXIST, errno.ENOTEMPTY) and not os.path.isdir(target):
+                raise
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    for name in os.listdir(entry):
+        if not name.startswith('.tmp-') and os.path.join(entry, name) != target:
+            shutil.rmtree(os.path.join(entry, name), ignore_errors=True)
+
+
+def read_cache(entry, key=None, columns=None, mmap=True):
+    """Load a cache entry, or return None if it is missing or ``key`` differs.
+
+    Without ``key`` the most recently published version is read.
+    """
+    try:
+        if key is not None:
+            version = _version_dir(entry, key)
+        else:
+            versions = [os.path.join(entry, v) for v in os.listdir(entry) if not v.startswith('.tmp-')]
+            version = max(versions, key=os.path.getmtime)
+        with open(os.path.join(version, 'meta.json')) as f:
+            meta = json.load(f)
+        if key is not None and meta['key'] != key:
+            return None
+
+        mode = 'r' if mmap else None
+        files = dict(zip(meta['columns'], meta['files']))
+        wanted = meta['columns'] if columns is None else list(columns)
+        index = pd.DatetimeIndex(np.load(os.path.join(version, '_index.npy')), name=meta['index_name'])
+        data = {c: np.load(os.path.join(version, files[c]), mmap_mode=mode) for c in wanted}
+    except (OSError, ValueError):
+        # Missing, or a stale version removed by a concurrent writer
+        return None
+    return pd.DataFrame(data, index=index, columns=wanted, copy=False)
+
+
+def load_price_frame(path, columns=None, date_column='Date', cache_dir=None, verify='mtime', mmap=True,
+                     refresh=False):
+    """Compact price frame for ``path``, served from the column cache when it
+    is up to date and rebuilt from CSV otherwise."""
+    key = source_key(path, verify)
+    entry = _entry_dir(path, cache_dir)
+    if not refresh:
+        frame = read_cache(entry, key, columns, mmap)
+        if frame is not None:
+            return frame
+
+    frame = read_price_csv(path, date_column)
+    write_cache(frame, entry, key)
+    return frame if columns is None else frame[list(columns)]
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    from portfolio_analytics import DATA_FILE
+
+    parser = argparse.ArgumentParser(description="Compare plain CSV loading with the compact column cache.")
+    parser.add_argument('path', nargs='?', default=DATA_FILE)
+    parser.add_argument('--verify', choices=['mtime', 'hash'], default='mtime')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    plain = pd.read_csv(args.path)
+    plain['Date'] = pd.to_datetime(plain['Date'])
+    print(f"read_csv + to_datetime: {time.perf_counter() - start:8.4f}s {plain.memory_usage(deep=True).sum():>12,} bytes")
+
+    start = time.perf_counter()
+    frame = load_price_frame(args.path, verify=args.verify, refresh=True)
+    print(f"compact CSV + cache:    {time.perf_counter() - start:8.4f}s {frame.memory_usage(deep=True).sum():>12,} bytes")
+
+    start = time.perf_counter()
+    frame = load_price_frame(args.path, verify=args.verify)
+    print(f"cache hit:              {time.perf_counter() - start:8.4f}s")
+    print(frame.dtypes.to_string())
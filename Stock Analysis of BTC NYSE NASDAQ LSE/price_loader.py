@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""Concurrent loading of per-ticker price files into the notebook's wide frame.
+
+The notebook reads one prepared file, ``btc nasdaq nyse.csv``, with a
+``Date`` column, one close-price column per asset and one ``<asset>_Volume``
+column per asset. Upstream, prices come as one file per ticker
+(``Date,Close,Volume``, extra columns such as ``Open`` are ignored), spread
+over local directories and HTTP object stores. ``load_ticker_prices`` fetches
+them with asyncio and builds that wide frame:
+
+- ``sources`` are searched in order for each ticker. A source is a local
+  directory or an ``http://`` / ``https://`` URL, optionally with a
+  ``{ticker}`` placeholder (default: ``<source>/<ticker>.csv``). A ticker
+  that is missing from one source (missing file, HTTP 404) is tried in the
+  next one,
+- at most ``concurrency`` files are in flight at once (an
+  ``asyncio.Semaphore``), HTTP requests reuse keep-alive connections from a
+  small pool per host, and CSV parsing runs in a thread pool so that it
+  overlaps with the downloads,
+- the series are aligned on ``Date``: ``join='inner'`` keeps the dates that
+  every ticker has, like the bundled file, ``'outer'`` keeps all of them::
+
+    prices = load_ticker_prices(['BTC', 'NYSE', 'NASDAQ', 'LSE'],
+                                ['data/tickers', 'http://127.0.0.1:8000/prices'])
+
+The client only needs the standard library. ``StandInServer`` serves a
+directory over HTTP/1.1 with keep-alive and an optional per-request latency,
+for tests and for the throughput benchmark (``python price_loader.py``).
+"""
+
+import asyncio
+import http.server
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'btc nasdaq nyse.csv')
+TICKER_DIR = os.path.join(os.path.dirname(DATA_FILE), 'tickers')
+DEFAULT_TICKERS = ['BTC', 'NYSE', 'NASDAQ', 'LSE']
+
+
+class HTTPError(OSError):
+    def __init__(self, url, status, reason):
+        super().__init__("%s: HTTP %d %s" % (url, status, reason))
+        self.status = status
+
+
+class ConnectionPool:
+    """Keep-alive HTTP/1.1 connections, at most ``per_host`` idle ones per host."""
+
+    def __init__(self, per_host=8, timeout=30.0):
+        self.per_host = per_host
+        self.timeout = timeout
+        self._idle = {}
+
+    async def get(self, url):
+        """Body of a ``GET`` as bytes; non-200 responses raise ``HTTPError``."""
+        parts = urlsplit(url)
+        secure = parts.scheme == 'https'
+        key = (parts.hostname, parts.port or (443 if secure else 80), secure)
+        target = (parts.path or '/') + ('?' + parts.query if parts.query else '')
+        request = ('GET %s HTTP/1.1\r\nHost: %s\r\nConnection: keep-alive\r\n\r\n' % (target, parts.netloc)).encode()
+
+        idle = self._idle.setdefault(key, [])
+        # A pooled connection may have been closed by the server; retry once on a fresh one
+        for reused in ([True] if idle else []) + [False]:
+            if reused:
+                reader, writer = idle.pop()
+            else:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(key[0], key[1], ssl=secure or None), self.timeout)
+            try:
+                writer.write(request)
+                status, reason, headers, body = await asyncio.wait_for(self._response(reader), self.timeout)
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if not reused:
+                    raise
+            except BaseException:
+                writer.close()
+                raise
+
+        if headers.get('connection', '').lower() == 'close' or len(idle) >= self.per_host:
+            writer.close()
+        else:
+            idle.append((reader, writer))
+        if status != 200:
+            raise HTTPError(url, status, reason)
+        return body
+
+    @staticmethod
+    async def _response(reader):
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed")
+        _, status, reason = status_line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = bytearray()
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                body += await reader.readexactly(size)
+                await reader.readexactly(2)
+            body = bytes(body)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            headers['connection'] = 'close'
+        return int(status), reason, headers, body
+
+    def close(self):
+        for connections in self._idle.values():
+            for _, writer in connections:
+                writer.close()
+        self._idle.clear()
+
+
+def _location(source, ticker):
+    template = source if '{ticker}' in source else source.rstrip('/') + '/{ticker}.csv'
+    return template.format(ticker=ticker)
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def parse_ticker_csv(data, ticker, price_column='Close', volume_column='Volume', date_column='Date'):
+    """``<ticker>`` and ``<ticker>_Volume`` columns indexed by date from one file's bytes."""
+    frame = pd.read_csv(io.BytesIO(data), index_col=date_column, parse_dates=True,
+                        usecols=lambda c: c in (date_column, price_column, volume_column))
+    if price_column not in frame:
+        raise ValueError("%s: no %r column" % (ticker, price_column))
+    frame = frame.rename(columns={price_column: ticker, volume_column: ticker + '_Volume'})
+    return frame[~frame.index.duplicated(keep='last')].sort_index()
+
+
+async def fetch_ticker_prices(tickers, sources, concurrency=16, price_column='Close', volume_column='Volume',
+                              timeout=30.0, parse_workers=None, stats=None):
+    """Fetch and parse every ticker concurrently; returns ``{ticker: frame}``.
+
+    Raises ``FileNotFoundError`` naming the tickers no source has. With a
+    ``stats`` dict, the bytes read and the source used per ticker are stored
+    in it.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    pool = ConnectionPool(per_host=concurrency, timeout=timeout)
+    stats = {} if stats is None else stats
+    stats.setdefault('bytes', 0)
+    stats.setdefault('source', {})
+
+    async def fetch(ticker, executor):
+        async with semaphore:
+            for source in sources:
+                location = _location(source, ticker)
+                try:
+                    if urlsplit(location).scheme in ('http', 'https'):
+                        data = await pool.get(location)
+                    else:
+                        data = await loop.run_in_executor(executor, _read_file, location)
+                except (FileNotFoundError, HTTPError) as exc:
+                    if isinstance(exc, HTTPError) and exc.status != 404:
+                        raise
+                    continue
+                stats['bytes'] += len(data)
+                stats['source'][ticker] = location
+                break
+            else:
+                return ticker, None
+        frame = await loop.run_in_executor(executor, parse_ticker_csv, data, ticker, price_column, volume_column)
+        return ticker, frame
+
+    try:
+        with ThreadPoolExecutor(parse_workers) as executor:
+            results = dict(await asyncio.gather(*(fetch(t, executor) for t in tickers)))
+    finally:
+        pool.close()
+    missing = [t for t, frame in results.items() if frame is None]
+    if missing:
+        raise FileNotFoundError("no source has %s (searched %s)" % (', '.join(missing), ', '.join(sources)))
+    return results
+
+
+def align_prices(frames, join='inner'):
+    """The wide ``Date, A, B, ..., A_Volume, B_Volume, ...`` frame of per-ticker frames."""
+    wide = pd.concat(list(frames.values()), axis=1, join=join).sort_index()
+    wide.index.name = 'Date'
+    prices = [c for c in wide.columns if not c.endswith('_Volume')]
+    return wide[prices + [c for c in wide.columns if c.endswith('_Volume')]]
+
+
+def load_ticker_prices(tickers=DEFAULT_TICKERS, sources=(TICKER_DIR,), join='inner', concurrency=16,
+                       price_column='Close', volume_column='Volume', timeout=30.0):
+    """Synchronous entry point: fetch, parse and align; see the module docstring."""
+    frames = asyncio.run(fetch_ticker_prices(list(tickers), list(sources), concurrency, price_column,
+                                             volume_column, timeout))
+    return align_prices(frames, join)
+
+
+def split_wide_frame(path=DATA_FILE, directory=TICKER_DIR):
+    """Write the bundled wide file as one ``Date,Close,Volume`` file per asset."""
+    data = pd.read_csv(path, index_col='Date')
+    os.makedirs(directory, exist_ok=True)
+    tickers = [c for c in data.columns if not c.endswith('_Volume')]
+    for ticker in tickers:
+        frame = pd.DataFrame({'Close': data[ticker]})
+        if ticker + '_Volume' in data:
+            frame['Volume'] = data[ticker + '_Volume']
+        frame.to_csv(os.path.join(directory, ticker + '.csv'))
+    return tickers
+
+
+class _Handler(http.server.SimpleHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; with Nagle on, keep-alive requests wait for delayed ACKs
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer:
+    """Serve ``directory`` on 127.0.0.1 from a background thread.
+
+    ``latency`` seconds are added to every request to imitate a remote
+    object store. Use as a context manager; ``url`` is the base URL::
+
+        with StandInServer('data/tickers', latency=0.02) as server:
+            load_ticker_prices(sources=[server.url])
+    """
+
+    def __init__(self, directory, port=0, latency=0.0):
+        handler = lambda *args, **kwargs: _Handler(*args, directory=directory, **kwargs)
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.latency = latency
+        self.url = 'http://127.0.0.1:%d' % self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._thread.join()
+
+
+def write_synthetic_tickers(directory, n_tickers, n_days=1383, seed=0):
+    """``n_tickers`` random-walk ``Date,Close,Volume`` files named ``T0000.csv``, ..."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(directory, exist_ok=True)
+    dates = pd.bdate_range('2018-01-02', periods=n_days, name='Date')
+    names = ['T%04d' % i for i in range(n_tickers)]
+    for name in names:
+        close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.015, n_days)))
+        volume = rng.integers(10_000, 10_000_000, n_days)
+        pd.DataFrame({'Close': close, 'Volume': volume}, index=dates).to_csv(os.path.join(directory, name + '.csv'))
+    return names
+
+
+def benchmark(n_tickers=200, n_days=1383, latency=0.02, concurrency=(1, 8, 32)):
+    """Files/s and MB/s from the stand-in server, sequential ``urllib`` against the async loader."""
+    import tempfile
+    import urllib.request
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tickers = write_synthetic_tickers(tmp, n_tickers, n_days)
+        size = sum(os.path.getsize(os.path.join(tmp, t + '.csv')) for t in tickers)
+        with StandInServer(tmp, latency=latency) as server:
+            start = time.perf_counter()
+            frames = {t: parse_ticker_csv(urllib.request.urlopen(_location(server.url, t)).read(), t)
+                      for t in tickers}
+            expected = align_prices(frames)
+            rows.append(('urllib, sequential', time.perf_counter() - start, True))
+            for n in concurrency:
+                start = time.perf_counter()
+                wide = load_ticker_prices(tickers, [server.url], concurrency=n)
+                rows.append(('asyncio, %d in flight' % n, time.perf_counter() - start, wide.equals(expected)))
+
+        start = time.perf_counter()
+        wide = load_ticker_prices(tickers, [tmp], concurrency=max(concurrency))
+        rows.append(('local directory', time.perf_counter() - start, wide.equals(expected)))
+    return [(name, seconds, n_tickers / seconds, size / 1e6 / seconds, same) for name, seconds, same in rows]
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Throughput of the per-ticker loader against a local stand-in server.")
+    parser.add_argument('--tickers', type=int, default=200)
+    parser.add_argument('--days', type=int, default=1383)
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds added to every request")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    print(f"{args.tickers} tickers x {args.days} days, {args.latency * 1000:.0f} ms per request")
+    for name, seconds, files, mb, same in benchmark(args.tickers, args.days, args.latency, args.concurrency):
+        print(f"  {name:<22} {seconds:7.3f}s {files:8.1f} files/s {mb:7.2f} MB/s"
+              f"{'' if same else '  (differs from sequential!)'}")
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""Drawdown, tail-risk and rolling risk metrics for every asset in one pass.
+
+The notebook reports ``returns.std()`` and the Sharpe ratio of the optimal
+portfolios only. ``risk_metrics`` takes a ``(days, assets)`` block of daily
+returns (a frame from ``daily_returns`` or an array) and computes for every
+column:
+
+- annualised return, volatility, Sharpe and Sortino ratios,
+- maximum drawdown with its peak, trough and recovery dates, and the longest
+  time spent below a previous peak,
+- historical VaR and CVaR (expected shortfall) at each of ``levels``, as
+  positive loss fractions,
+- rolling volatility, Sharpe and Sortino ratios for each of ``windows``,
+- rolling correlation of every column with ``benchmark`` for each window.
+
+Every window sum comes from one set of prefix sums (of returns, squared
+returns, downside squares and benchmark cross products), so a window costs a
+subtraction of two shifted arrays whatever its length, and further windows
+reuse the same prefix sums. Drawdown peaks and recoveries come from running
+maxima and minima of date positions; the quantiles from a single sort along
+the date axis. No step loops over assets, dates or windows in Python except
+the short list of window lengths::
+
+    metrics = risk_metrics(daily_returns(prices), windows=(21, 63, 252))
+    metrics.summary.loc['BTC', ['max_drawdown', 'max_drawdown_days', 'cvar_95']]
+    metrics.rolling['sharpe', 63]
+
+Rows with a missing return are left out of window sums; a window with fewer
+than ``window`` valid returns is NaN, as in ``DataFrame.rolling(window)``.
+Missing returns count as flat days in the drawdown.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+WINDOWS = (21, 63, 252)
+LEVELS = (0.95, 0.99)
+
+
+@dataclass
+class RiskMetrics:
+    """``summary``: assets x metrics; ``drawdown``: dates x assets (fraction
+    below the running peak); ``rolling``: ``(metric, window)`` -> dates x
+    assets frame for ``'volatility'``, ``'sharpe'``, ``'sortino'`` and
+    ``'correlation'``."""
+    summary: pd.DataFrame
+    drawdown: pd.DataFrame
+    rolling: dict
+
+
+def _prefix(values):
+    """Prefix sums along the date axis with a leading row of zeros."""
+    out = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+def _window_sum(prefix, window):
+    """Sums over every trailing window, aligned with the window's last row;
+    the first ``window - 1`` rows are NaN."""
+    out = np.full((len(prefix) - 1,) + prefix.shape[1:], np.nan)
+    out[window - 1:] = prefix[window:] - prefix[:-window]
+    return out
+
+
+def _drawdowns(X, dates):
+    n = len(X)
+    wealth = np.cumprod(1.0 + np.nan_to_num(X), axis=0)
+    peak = np.maximum.accumulate(wealth, axis=0)
+    drawdown = wealth / peak - 1.0
+    positions = np.broadcast_to(np.arange(n)[:, None], X.shape)
+    at_peak = drawdown >= 0
+    last_peak = np.maximum.accumulate(np.where(at_peak, positions, -1), axis=0)
+    next_peak = np.minimum.accumulate(np.where(at_peak, positions, n)[::-1], axis=0)[::-1]
+
+    columns = np.arange(X.shape[1])
+    trough = drawdown.argmin(axis=0)
+    start = np.maximum(last_peak[trough, columns], 0)
+    recovery = next_peak[trough, columns]
+    # Before the first peak counts as underwater from the first day
+    underwater = positions - np.maximum(last_peak, 0)
+    dates = pd.Index(dates)
+    date_at = lambda pos: dates[np.minimum(pos, n - 1)].where(pos < n)
+    stats = {
+        'max_drawdown': -drawdown.min(axis=0),
+        'drawdown_peak': date_at(start),
+        'drawdown_trough': date_at(trough),
+        'drawdown_recovery': date_at(recovery),
+        'max_drawdown_days': underwater.max(axis=0),
+        'current_drawdown': -drawdown[-1],
+    }
+    return drawdown, stats
+
+
+def _tail_risk(X, levels):
+    """Historical VaR (``np.nanquantile`` with linear interpolation) and CVaR
+    (mean of the returns up to the lower quantile neighbour)."""
+    ordered = np.sort(X, axis=0)            # NaNs sort last
+    counts = (~np.isnan(X)).sum(axis=0)
+    prefix = _prefix(np.nan_to_num(ordered))
+    columns = np.arange(X.shape[1])
+    stats = {}
+    for level in levels:
+        position = (counts - 1) * (1.0 - level)
+        low = np.floor(position).astype(int).clip(0)
+        high = np.ceil(position).astype(int).clip(0)
+        fraction = position - low
+        quantile = ordered[low, columns] * (1 - fraction) + ordered[high, columns] * fraction
+        label = '%g' % (level * 100)
+        stats['var_' + label] = -quantile
+        stats['cvar_' + label] = -prefix[low + 1, columns] / (low + 1)
+    return stats
+
+
+def risk_metrics(returns, windows=WINDOWS, levels=LEVELS, benchmark=None, risk_free_rate=0.0, frequency=252,
+                 weights=None):
+    """Compute the ``RiskMetrics`` of every column of ``returns``.
+
+    ``benchmark`` is a column name or a return series for the rolling
+    correlations; by default the equal-weighted average of all columns.
+    ``weights`` (a dict or vector over the columns) adds a ``portfolio``
+    column with the daily-rebalanced portfolio's returns. ``risk_free_rate``
+    is annual.
+    """
+    if isinstance(returns, pd.DataFrame):
+        dates, assets = returns.index, list(returns.columns)
+        X = returns.to_numpy(dtype=float)
+    else:
+        X = np.asarray(returns, dtype=float)
+        dates, assets = pd.RangeIndex(len(X)), list(range(X.shape[1]))
+
+    if weights is not None:
+        if isinstance(weights, dict):
+            weights = [weights.get(a, 0.0) for a in assets]
+        X = np.column_stack([X, np.nan_to_num(X) @ np.asarray(weights, dtype=float)])
+        assets = assets + ['portfolio']
+
+    if benchmark is None:
+        market = X[:, :len(assets) - (weights is not None)]
+        present = (~np.isnan(market)).sum(axis=1)
+        reference = np.nansum(market, axis=1) / np.where(present > 0, present, np.nan)
+    elif isinstance(benchmark, str) or np.isscalar(benchmark):
+        reference = X[:, assets.index(benchmark)]
+    else:
+        reference = np.asarray(benchmark, dtype=float)
+
+    rf = risk_free_rate / frequency
+    valid = ~np.isnan(X)
+    paired = valid & ~np.isnan(reference)[:, None]
+    count = valid.sum(axis=0)
+    # Shifting by the column means keeps the squared sums well conditioned
+    with np.errstate(divide='ignore', invalid='ignore'):
+        center = np.where(count > 0, np.nansum(X, axis=0) / count, np.nan)
+    shifted = np.where(valid, X - center, 0.0)
+    downside = np.where(valid, np.minimum(X - rf, 0.0) ** 2, 0.0)
+
+    annual = np.sqrt(frequency)
+    mean = center
+    # Spreads need two returns, as ``DataFrame.std``; NaN rather than a division by count - 1 <= 0
+    spread = count > 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        std = np.where(spread, np.sqrt((shifted ** 2).sum(axis=0) / (count - 1)), np.nan)
+        downside_dev = np.where(spread, np.sqrt(downside.sum(axis=0) / count), np.nan)
+        summary = {
+            'days': count,
+            'annual_return': mean * frequency,
+            'volatility': std * annual,
+            'sharpe': (mean - rf) / std * annual,
+            'sortino': (mean - rf) / downside_dev * annual,
+        }
+    drawdown, drawdown_stats = _drawdowns(X, dates)
+    summary.update(drawdown_stats)
+    summary.update(_tail_risk(X, levels))
+    # A column without returns has no drawdown or tail either
+    empty = count == 0
+    for name in list(drawdown_stats) + [k for k in summary if k.startswith(('var_', 'cvar_'))] if empty.any() else []:
+        values = summary[name]
+        summary[name] = values.where(~empty) if isinstance(values, pd.Index) else np.where(empty, np.nan, values)
+
+    ref_center = np.nanmean(reference)
+    ref_shifted = np.where(np.isnan(reference), 0.0, reference - ref_center)[:, None]
+    sums = {
+        'n': _prefix(valid.astype(float)),
+        'x': _prefix(shifted),
+        'xx': _prefix(shifted ** 2),
+        'down': _prefix(downside),
+    }
+    if (paired == valid).all():
+        sums.update(np=sums['n'], px=sums['x'], pxx=sums['xx'])
+    else:
+        pairs = paired.astype(float)
+        sums.update(np=_prefix(pairs), px=_prefix(shifted * pairs), pxx=_prefix(shifted ** 2 * pairs))
+    sums.update(py=_prefix(ref_shifted * paired), pyy=_prefix(ref_shifted ** 2 * paired),
+                pxy=_prefix(shifted * ref_shifted))
+
+    rolling = {}
+    frame = lambda values: pd.DataFrame(values, index=dates, columns=assets)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for window in windows:
+            w = {name: _window_sum(prefix, window) for name, prefix in sums.items()}
+            full = w['n'] == window
+            window_mean = w['x'] / window
+            var = np.maximum(w['xx'] - w['x'] * window_mean, 0.0) / (window - 1)
+            vol = np.where(full, np.sqrt(var), np.nan)
+            excess = window_mean + center - rf
+            rolling['volatility', window] = frame(vol * annual)
+            rolling['sharpe', window] = frame(excess / vol * annual)
+            rolling['sortino', window] = frame(np.where(full, excess / np.sqrt(w['down'] / window) * annual, np.nan))
+
+            covariance = w['pxy'] - w['px'] * w['py'] / w['np']
+            x_var = w['pxx'] - w['px'] ** 2 / w['np']
+            y_var = w['pyy'] - w['py'] ** 2 / w['np']
+            correlation = covariance / np.sqrt(x_var * y_var)
+            rolling['correlation', window] = frame(np.where(w['np'] == window, correlation, np.nan))
+
+    summary = pd.DataFrame(summary, index=assets)
+    return RiskMetrics(summary, frame(drawdown), rolling)
+
+
+def _pandas_reference(returns, windows, benchmark):
+    """The same metrics with pandas rolling windows, one asset at a time."""
+    out = {}
+    for window in windows:
+        roll = returns.rolling(window)
+        out['volatility', window] = roll.std() * np.sqrt(252)
+        out['correlation', window] = returns.rolling(window).corr(benchmark)
+    wealth = (1 + returns.fillna(0)).cumprod()
+    out['max_drawdown'] = -(wealth / wealth.cummax() - 1).min()
+    out['var_95'] = -returns.quantile(0.05)
+    return out
+
+
+def benchmark(n_days=1383, n_assets=(4, 500, 2000), windows=WINDOWS, seed=0):
+    """Time ``risk_metrics`` against pandas rolling windows on synthetic returns
+    and report the largest difference."""
+    import time
+
+    rng = np.random.default_rng(seed)
+    rows = []
+    for n in n_assets:
+        returns = pd.DataFrame(rng.standard_t(4, size=(n_days, n)) * 0.01,
+                               index=pd.bdate_range('2018-01-02', periods=n_days))
+        returns.iloc[0] = np.nan
+        start = time.perf_counter()
+        metrics = risk_metrics(returns, windows)
+        ours = time.perf_counter() - start
+
+        market = returns.mean(axis=1)
+        start = time.perf_counter()
+        reference = _pandas_reference(returns, windows, market)
+        theirs = time.perf_counter() - start
+        diff = max(np.nanmax(np.abs(metrics.rolling[key].to_numpy() - reference[key].to_numpy()))
+                   for key in reference if isinstance(key, tuple))
+        diff = max(diff, np.abs(metrics.summary['max_drawdown'] - reference['max_drawdown']).max(),
+                   np.abs(metrics.summary['var_95'] - reference['var_95']).max())
+        rows.append((n, ours, theirs, diff))
+    return rows
+
+
+if __name__ == '__main__':
+    import argparse
+
+    from portfolio_analytics import DEFAULT_ASSETS, daily_returns, load_prices
+
+    parser = argparse.ArgumentParser(description="Risk metrics of the notebook assets, or a timing comparison.")
+    parser.add_argument('--windows', type=int, nargs='+', default=list(WINDOWS))
+    parser.add_argument('--benchmark', action='store_true', help="time against pandas on synthetic returns")
+    parser.add_argument('--assets', type=int, nargs='+', default=[4, 500, 2000], help="asset counts for --benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        print(f"{len(args.windows)} windows {args.windows}, volatility/Sharpe/Sortino/correlation + summary")
+        for n, ours, theirs, diff in benchmark(n_assets=args.assets, windows=args.windows):
+            print(f"  {n:>5} assets: risk_metrics {ours:8.4f}s  pandas (volatility + correlation only) "
+                  f"{theirs:8.4f}s  max diff {diff:.1e}")
+    else:
+        metrics = risk_metrics(daily_returns(load_prices(columns=DEFAULT_ASSETS)), args.windows)
+        with pd.option_context('display.width', 200, 'display.max_columns', None):
+            print(metrics.summary.T)
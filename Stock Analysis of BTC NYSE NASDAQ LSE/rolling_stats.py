@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""Incremental statistics for appended daily closes.
+
+Instead of recomputing ``df.pct_change()``, ``returns.std()``, ``df.corr()``
+and ``risk_models.sample_cov(df)`` over the whole history every run, the
+classes here keep running moments and co-moments and are updated one row at
+a time in O(assets ** 2):
+
+- ``RunningMoments``: expanding window (Welford), matches ``DataFrame.cov()``
+- ``RollingMoments``: last ``window`` rows, matches ``.rolling(window).cov()``
+- ``EWMMoments``: exponentially weighted, matches ``.ewm(...).cov()``
+- ``IncrementalPriceStats``: turns price rows into returns and feeds the above
+
+Rows that contain a NaN are skipped, so results equal pandas whenever the
+input has no gaps. Run ``python rolling_stats.py`` to check the engine
+against the batch pandas / PyPortfolioOpt results on the shipped data.
+"""
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+
+def _corr_from_cov(cov):
+    std = np.sqrt(np.diag(cov))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cov / np.outer(std, std)
+
+
+class RunningMoments:
+    """Expanding mean and covariance updated with Welford's algorithm."""
+
+    def __init__(self, n_assets):
+        self.n_assets = n_assets
+        self.count = 0
+        self.mean = np.zeros(n_assets)
+        self.comoment = np.zeros((n_assets, n_assets))
+
+    def update(self, x):
+        """Add one observation (a length ``n_assets`` vector)."""
+        x = np.asarray(x, dtype=float)
+        if np.isnan(x).any():
+            return
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.comoment += np.outer(delta, x - self.mean)
+
+    def update_batch(self, X):
+        """Add a block of observations at once by merging its moments (Chan et al.)."""
+        X = np.asarray(X, dtype=float)
+        X = X[~np.isnan(X).any(axis=1)]
+        m = len(X)
+        if m == 0:
+            return
+        batch_mean = X.mean(axis=0)
+        centered = X - batch_mean
+        n = self.count + m
+        delta = batch_mean - self.mean
+        self.comoment += centered.T @ centered + np.outer(delta, delta) * self.count * m / n
+        self.mean += delta * m / n
+        self.count = n
+
+    def cov(self, ddof=1):
+        if self.count <= ddof:
+            return np.full((self.n_assets, self.n_assets), np.nan)
+        return self.comoment / (self.count - ddof)
+
+    def corr(self):
+        return _corr_from_cov(self.cov())
+
+    def std(self, ddof=1):
+        return np.sqrt(np.diag(self.cov(ddof)))
+
+
+class RollingMoments(RunningMoments):
+    """Mean and covariance of the last ``window`` observations.
+
+    Each update adds the new row and removes the oldest one (reverse Welford
+    step). The moments are rebuilt from the buffer once every ``window``
+    updates to stop rounding errors accumulating, which keeps the amortised
+    cost at O(assets ** 2) per row.
+    """
+
+    def __init__(self, n_assets, window):
+        super().__init__(n_assets)
+        self.window = window
+        self._buffer = deque()
+        self._since_rebuild = 0
+
+    def update(self, x):
+        x = np.asarray(x, dtype=float)
+        if np.isnan(x).any():
+            return
+        self._buffer.append(x)
+        super().update(x)
+        if len(self._buffer) > self.window:
+            self._remove(self._buffer.popleft())
+
+        self._since_rebuild += 1
+        if self._since_rebuild >= self.window:
+            self._rebuild()
+
+    def update_batch(self, X):
+        for x in np.asarray(X, dtype=float):
+            self.update(x)
+
+    def _remove(self, x):
+        self.count -= 1
+        delta = x - self.mean
+        self.mean -= delta / self.count
+        self.comoment -= np.outer(delta, x - self.mean)
+
+    def _rebuild(self):
+        X = np.array(self._buffer)
+        self.count = len(X)
+        self.mean = X.mean(axis=0)
+        centered = X - self.mean
+        self.comoment = centered.T @ centered
+        self._since_rebuild = 0
+
+    def cov(self, ddof=1):
+        if self.count < self.window:
+            return np.full((self.n_assets, self.n_assets), np.nan)
+        return super().cov(ddof)
+
+
+class EWMMoments:
+    """Exponentially weighted mean and covariance.
+
+    Give exactly one of ``alpha``, ``span`` or ``halflife`` with the same
+    meaning as in ``DataFrame.ewm``. With ``adjust=True`` (the pandas default)
+    observation ``i`` of ``n`` has weight ``(1 - alpha) ** (n - 1 - i)``.
+    """
+
+    def __init__(self, n_assets, alpha=None, span=None, halflife=None, adjust=True):
+        if sum(p is not None for p in (alpha, span, halflife)) != 1:
+            raise ValueError("give exactly one of alpha, span or halflife")
+        if span is not None:
+            alpha = 2.0 / (span + 1.0)
+        elif halflife is not None:
+            alpha = 1.0 - np.exp(-np.log(2.0) / halflife)
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+
+        self.n_assets = n_assets
+        self.alpha = alpha
+        self.adjust = adjust
+        self.count = 0
+        self.weight_sum = 0.0
+        self.weight_sq_sum = 0.0
+        self.mean = np.zeros(n_assets)
+        self.comoment = np.zeros((n_assets, n_assets))
+
+    def update(self, x):
+        x = np.asarray(x, dtype=float)
+        if np.isnan(x).any():
+            return
+        decay = 1.0 - self.alpha
+        weight = 1.0 if self.adjust or self.count == 0 else self.alpha
+        self.weight_sum *= decay
+        self.weight_sq_sum *= decay * decay
+        self.comoment *= decay
+
+        self.count += 1
+        self.weight_sum += weight
+        self.weight_sq_sum += weight * weight
+        delta = x - self.mean
+        self.mean += delta * (weight / self.weight_sum)
+        self.comoment += weight * np.outer(delta, x - self.mean)
+
+    def update_batch(self, X):
+        for x in np.asarray(X, dtype=float):
+            self.update(x)
+
+    def cov(self, bias=False):
+        if self.count < 2:
+            return np.full((self.n_assets, self.n_assets), np.nan)
+        if bias:
+            return self.comoment / self.weight_sum
+        return self.comoment / (self.weight_sum - self.weight_sq_sum / self.weight_sum)
+
+    def corr(self):
+        return _corr_from_cov(self.cov(bias=True))
+
+    def std(self, bias=False):
+        return np.sqrt(np.diag(self.cov(bias)))
+
+
+class IncrementalPriceStats:
+    """Running price and daily-return statistics for a fixed set of columns.
+
+    ``append`` takes new close prices (a row, a Series or a whole DataFrame)
+    and updates the expanding moments of prices and returns, plus optional
+    rolling and exponentially weighted return moments. The accessors return
+    labelled pandas objects so they can stand in for the batch calls:
+
+    - ``price_corr()`` for ``df.corr()``
+    - ``returns_std()`` for ``df.pct_change().std()``
+    - ``sample_cov()`` for ``risk_models.sample_cov(df)``
+    """
+
+    def __init__(self, columns, window=None, ewm_span=None, frequency=252):
+        self.columns = list(columns)
+        n = len(self.columns)
+        self.frequency = frequency
+        self.prices = RunningMoments(n)
+        self.returns = RunningMoments(n)
+        self.rolling = RollingMoments(n, window) if window else None
+        self.ewm = EWMMoments(n, span=ewm_span) if ewm_span else None
+        self.last_price = None
+        self.last_index = None
+
+    def append(self, rows):
+        """Ingest new closes; a DataFrame is processed in one vectorised step."""
+        if isinstance(rows, pd.DataFrame):
+            values = rows[self.columns].to_numpy(dtype=float)
+            index = rows.index[-1] if len(rows) else None
+        elif isinstance(rows, pd.Series):
+            values = rows[self.columns].to_numpy(dtype=float)[None, :]
+            index = rows.name
+        else:
+            values = np.atleast_2d(np.asarray(rows, dtype=float))
+            index = None
+        if len(values) == 0:
+            return
+
+        previous = values[:-1] if self.last_price is None else np.vstack([self.last_price, values[:-1]])
+        returns = values[-len(previous):] / previous - 1 if len(previous) else np.empty((0, values.shape[1]))
+
+        self.prices.update_batch(values)
+        self.returns.update_batch(returns)
+        if self.rolling is not None:
+            self.rolling.update_batch(returns)
+        if self.ewm is not None:
+            self.ewm.update_batch(returns)
+        self.last_price = values[-1]
+        self.last_index = index
+
+    def _frame(self, values):
+        return pd.DataFrame(values, index=self.columns, columns=self.columns)
+
+    def _series(self, values):
+        return pd.Series(values, index=self.columns)
+
+    def price_corr(self):
+        return self._frame(self.prices.corr())
+
+    def returns_mean(self):
+        return self._series(self.returns.mean.copy())
+
+    def returns_std(self):
+        return self._series(self.returns.std())
+
+    def returns_cov(self):
+        return self._frame(self.returns.cov())
+
+    def returns_corr(self):
+        return self._frame(self.returns.corr())
+
+    def sample_cov(self):
+        """Annualised covariance of daily returns, as ``risk_models.sample_cov``."""
+        return self._frame(self.returns.cov() * self.frequency)
+
+    def volatility(self, annualized=True):
+        scale = np.sqrt(self.frequency) if annualized else 1.0
+        return self._series(self.returns.std() * scale)
+
+    def rolling_cov(self):
+        return self._frame(self.rolling.cov())
+
+    def rolling_volatility(self, annualized=True):
+        scale = np.sqrt(self.frequency) if annualized else 1.0
+        return self._series(self.rolling.std() * scale)
+
+    def ewm_cov(self):
+        return self._frame(self.ewm.cov())
+
+    def ewm_corr(self):
+        return self._frame(self.ewm.corr())
+
+
+def check_against_pandas(prices, window=60, ewm_span=30, split=0.8):
+    """Feed ``prices`` in two parts (bulk, then row by row) and return the
+    largest absolute difference to each batch pandas / PyPortfolioOpt result."""
+    from pypfopt import risk_models
+
+    cut = int(len(prices) * split)
+    stats = IncrementalPriceStats(prices.columns, window=window, ewm_span=ewm_span)
+    stats.append(prices.iloc[:cut])
+    for _, row in prices.iloc[cut:].iterrows():
+        stats.append(row)
+
+    returns = prices.pct_change()
+    expected = {
+        'price_corr': (stats.price_corr(), prices.corr()),
+        'returns_std': (stats.returns_std(), returns.std()),
+        'returns_corr': (stats.returns_corr(), returns.corr()),
+        'sample_cov': (stats.sample_cov(), risk_models.sample_cov(prices)),
+        'rolling_cov': (stats.rolling_cov(), returns.rolling(window).cov().iloc[-len(prices.columns):].droplevel(0)),
+        'ewm_cov': (stats.ewm_cov(), returns.ewm(span=ewm_span).cov().iloc[-len(prices.columns):].droplevel(0)),
+    }
+    return {name: float(np.max(np.abs(np.asarray(a) - np.asarray(b)))) for name, (a, b) in expected.items()}
+
+
+if __name__ == '__main__':
+    from portfolio_analytics import DEFAULT_ASSETS, load_prices
+
+    for name, error in check_against_pandas(load_prices(columns=DEFAULT_ASSETS)).items():
+        print(f"{name:>14}: max abs diff {error:.3e}")
@@ -45,7 +45,6 @@ These are keywords for this analysis.
 This section to prepare data for the analysis.
 """
 
-import numpy as np
 import pandas as pd
 
 import os
@@ -53,16 +52,15 @@ for dirname, _, filenames in os.walk('/kaggle/input'):
     for filename in filenames:
         print(os.path.join(dirname, filename))
 
-pip install PyPortfolioOpt
+# !pip install PyPortfolioOpt
 
-data = pd.read_csv('./btc-nasdaq-nyse.csv')
-data
+# Loading and the optimisation steps below live in portfolio_analytics.py, which also runs them headless in batch
+from portfolio_analytics import DATA_FILE, DEFAULT_ASSETS, load_prices
 
-df = data[['Date', 'BTC', 'NYSE', 'NASDAQ', 'LSE']]
-df
+data = pd.read_csv(DATA_FILE)
+data
 
-df['Date']= pd.to_datetime(df['Date'])
-df = df.set_index('Date')
+df = load_prices(DATA_FILE, DEFAULT_ASSETS)
 df
 
 """# 4. Analysis
@@ -167,29 +165,25 @@ ef.portfolio_performance(verbose=True)
 
 # Display the two points on a Efficient Frontier plot
 
-from pypfopt import plotting
+# The frontier curve and both marked portfolios come from one warm-started sweep (see frontier.py)
+from frontier import sweep_frontier
 
-ef = EfficientFrontier(mu, S)
+frontier = sweep_frontier(mu, S, n_points=100, risk_free_rates=[0.05])
 
 fig, ax = plt.subplots(figsize=(12, 6))
-plotting.plot_efficient_frontier(ef, ax=ax, show_assets=False)
+ax.plot(frontier.points['volatility'], frontier.points['return'], label="Efficient frontier")
+ax.set_xlabel("Volatility")
+ax.set_ylabel("Return")
 
-ef_max_sharpe = EfficientFrontier(mu, S)
-ef_max_sharpe.max_sharpe(risk_free_rate=0.05)
-ret_tangent, std_tangent, _ = ef_max_sharpe.portfolio_performance(risk_free_rate=0.05)
-ax.scatter(std_tangent, ret_tangent, marker="*", s=200, c="r", label="Max Sharpe")
+ax.scatter(frontier.max_sharpe['volatility'], frontier.max_sharpe['return'], marker="*", s=200, c="r", label="Max Sharpe")
+ax.scatter(frontier.min_volatility['volatility'], frontier.min_volatility['return'], marker="*", s=200, c="blue", label="Min Volatility")
 
-ef_min_volatility = EfficientFrontier(mu, S)
-ef_min_volatility.min_volatility()
-ret_min_volatility, std_min_volatility, _ = ef_min_volatility.portfolio_performance()
-ax.scatter(std_min_volatility, ret_min_volatility, marker="*", s=200, c="blue", label="Min Volatility")
+# Random portfolios are evaluated in chunks (see random_portfolios.py), so n_samples can grow without an n_samples x n_samples matrix
+from random_portfolios import simulate_random_portfolios
 
 n_samples = 1000
-w = np.random.dirichlet(np.ones(ef.n_assets), n_samples)
-rets = w.dot(ef.expected_returns)
-stds = np.sqrt(np.diag(w @ ef.cov_matrix @ w.T))
-sharpes = rets / stds
-ax.scatter(stds, rets, marker=".", c=sharpes, cmap="viridis_r")
+cloud = simulate_random_portfolios(mu, S, n_samples)
+ax.scatter(cloud.volatility, cloud.returns, marker=".", c=cloud.sharpe, cmap="viridis_r")
 ax.set_title("Efficient Frontier with Random Portfolios")
 ax.legend()
 plt.tight_layout()
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Figures of the stock analysis as pure functions for headless rendering.
+
+Every function takes the price frame (plus keyword parameters) and returns a
+matplotlib Figure without showing it. ``FIGURES`` maps output names to
+``(function, params)`` and ``SOURCES`` lists the files the figures depend on;
+render_figures.py in the repository root uses both to render the figures in
+parallel into ``Visualizations/`` and to skip unchanged ones.
+"""
+
+import os
+
+import numpy as np
+
+from portfolio_analytics import DATA_FILE, DEFAULT_ASSETS, daily_returns, estimate_inputs, load_prices, normalized_prices
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(HERE, 'Visualizations')
+SOURCES = [DATA_FILE]
+
+STYLE = {
+    'font.sans-serif': ['Arial', 'DejaVu Sans'],
+    'axes.unicode_minus': False,
+    'axes.facecolor': '#CFDBE7',
+    'savefig.facecolor': '#CFDBE7',
+    'axes.axisbelow': True,
+}
+
+
+def load_data():
+    return load_prices(DATA_FILE, DEFAULT_ASSETS)
+
+
+def price_history(df):
+    import matplotlib.pyplot as plt
+
+    with plt.rc_context(STYLE):
+        fig = plt.figure(figsize=(8, 4), dpi=100, facecolor='#CFDBE7')
+        ax = fig.gca()
+        for column in df.columns:
+            ax.plot(df[column], label=column)
+        ax.tick_params(labelsize=12)
+        ax.grid(axis="y", c='w', linewidth=1.2)
+        ax.set_ylabel("Price USD($)", labelpad=10, size=14)
+        ax.legend(loc=(0, 1.02), ncol=4, frameon=False)
+        for side in ('top', 'right', 'left'):
+            ax.spines[side].set_color('none')
+        ax.yaxis.set_ticks_position('right')
+        ax.text(0., 1.25, s='WHAT DOES THE STOCK PRICE LOOK LIKE\nSINCE 2018 to 2023?\n', transform=ax.transAxes,
+                weight='bold', size=20)
+        ax.text(0, 1.12, s='Close Price History of Product Portfolio\n(BTC, NYSE, NASDAQ, LSE).',
+                transform=ax.transAxes, weight='light', size=15)
+        ax.text(0., -0.15, s='*Bitcoin went high price with unstability during 2020 and 2021.', transform=ax.transAxes,
+                weight='light', size=10)
+    return fig
+
+
+def daily_returns_plot(df):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(15, 10))
+    daily_returns(df).plot(ax=ax)
+    return fig
+
+
+def normalized_prices_plot(df):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    normalized_prices(df).plot(ax=ax)
+    return fig
+
+
+def returns_kde(df, xlim=(-0.1, 0.1)):
+    import seaborn as sns
+
+    grid = sns.displot(data=daily_returns(df), kind='kde', aspect=2)
+    grid.ax.set_xlim(*xlim)
+    return grid.figure
+
+
+def correlation_heatmap(df):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots()
+    sns.heatmap(df.corr().round(2), cmap='YlGn', annot=True, ax=ax)
+    return fig
+
+
+def efficient_frontier(df, n_points=100, risk_free_rate=0.05, n_samples=1000, seed=0):
+    import matplotlib.pyplot as plt
+
+    from frontier import sweep_frontier
+    from random_portfolios import simulate_random_portfolios
+
+    mu, S = estimate_inputs(df)
+    frontier = sweep_frontier(mu, S, n_points=n_points, risk_free_rates=[risk_free_rate])
+    cloud = simulate_random_portfolios(mu, S, n_samples, seed=seed)
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.plot(frontier.points['volatility'], frontier.points['return'], label="Efficient frontier")
+    ax.scatter(frontier.max_sharpe['volatility'], frontier.max_sharpe['return'], marker="*", s=200, c="r",
+               label="Max Sharpe")
+    ax.scatter(frontier.min_volatility['volatility'], frontier.min_volatility['return'], marker="*", s=200,
+               c="blue", label="Min Volatility")
+    ax.scatter(cloud.volatility, cloud.returns, marker=".", c=np.nan_to_num(cloud.sharpe), cmap="viridis_r")
+    ax.set_xlabel("Volatility")
+    ax.set_ylabel("Return")
+    ax.set_title("Efficient Frontier with Random Portfolios")
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+FIGURES = {
+    'price_history': (price_history, {}),
+    'daily_returns': (daily_returns_plot, {}),
+    'normalized_prices': (normalized_prices_plot, {}),
+    'returns_kde': (returns_kde, {'xlim': (-0.1, 0.1)}),
+    'correlation_heatmap': (correlation_heatmap, {}),
+    'efficient_frontier': (efficient_frontier, {'n_points': 100, 'risk_free_rate': 0.05, 'n_samples': 1000,
+                                                'seed': 0}),
+}
@@ -0,0 +1,387 @@
+# -*- coding: utf-8 -*-
+"""Benchmark both analysis pipelines on synthetic data of any size.
+
+The bundled CSVs are tiny (953 tracks, 1,383 trading days), so this script
+generates files with the same schemas at the requested sizes:
+
+- price files like ``btc nasdaq nyse.csv``: a Date column, one close price
+  column per asset and a ``<asset>_Volume`` column each;
+- track files like ``spotify-2023.csv``: all 24 columns in ISO-8859-1, with
+  the same quirks (thousands separators in ``in_deezer_playlists`` and
+  ``in_shazam_charts``, missing ``key`` and ``in_shazam_charts`` values, one
+  malformed ``streams`` entry and multi-artist credits).
+
+Files are written chunk by chunk, so 10^8-row inputs only need disk space, and
+are kept under ``.benchmarks/data`` for later runs. Every pipeline stage is
+timed (best of ``--repeat``) and then run once more under ``tracemalloc``
+for its peak allocation::
+
+    python benchmark_suite.py                                   # default sizes
+    python benchmark_suite.py stock --price-rows 5000 --assets 4 500 5000
+    python benchmark_suite.py spotify --track-rows 1000 1000000 --stages load,clean,groupbys
+    python benchmark_suite.py --save-baseline
+
+Results are compared with the stored baseline (``.benchmarks/baseline.json``).
+A stage slower or hungrier than its baseline by more than ``--tolerance`` is
+reported as a regression and the script exits with status 1.
+"""
+
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(ROOT, '.benchmarks')
+BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+for _folder in ('Stock Analysis of BTC NYSE NASDAQ LSE', 'Spotify 2023 Analysis'):
+    if os.path.join(ROOT, _folder) not in sys.path:
+        sys.path.insert(0, os.path.join(ROOT, _folder))
+
+SPOTIFY_ENCODING = 'ISO-8859-1'
+KEYS = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+ARTIST_COUNTS = [587, 254, 85, 15, 5, 3, 2, 2]  # credits with 1..8 artists in spotify-2023.csv
+CHUNK_ROWS = 250_000
+
+
+# -- synthetic data -----------------------------------------------------------
+
+def _asset_names(n_assets):
+    base = ['BTC', 'NYSE', 'NASDAQ', 'LSE']
+    return base[:n_assets] + ['A%04d' % i for i in range(len(base), n_assets)]
+
+
+def write_prices(path, n_rows, n_assets=4, seed=0):
+    """Write a geometric-random-walk price file with the ``btc nasdaq nyse.csv`` schema."""
+    rng = np.random.default_rng(seed)
+    assets = _asset_names(n_assets)
+    level = np.log(rng.uniform(50, 20_000, n_assets))
+    vol = rng.uniform(0.005, 0.04, n_assets)
+    dates = pd.bdate_range('2018-01-02', periods=n_rows)
+    with open(path, 'w', newline='') as f:
+        for start in range(0, n_rows, CHUNK_ROWS):
+            rows = min(CHUNK_ROWS, n_rows - start)
+            steps = rng.normal(0.0003, 1.0, (rows, n_assets)) * vol
+            log_prices = level + np.cumsum(steps, axis=0)
+            level = log_prices[-1]
+            frame = pd.DataFrame(np.exp(log_prices), columns=assets)
+            volumes = rng.lognormal(18, 1.5, (rows, n_assets)).astype(np.int64)
+            frame = pd.concat([frame, pd.DataFrame(volumes, columns=[a + '_Volume' for a in assets])], axis=1)
+            frame.insert(0, 'Date', dates[start:start + rows].strftime('%Y-%m-%d'))
+            frame.to_csv(f, header=start == 0, index=False)
+
+
+def _credits(rng, artists, n_rows):
+    counts = rng.choice(np.arange(1, 9), n_rows, p=np.array(ARTIST_COUNTS) / sum(ARTIST_COUNTS))
+    # A Zipf-like popularity so a few artists appear in many credits
+    popularity = 1.0 / np.arange(1, len(artists) + 1)
+    popularity /= popularity.sum()
+    credits = np.empty(n_rows, dtype=object)
+    for k in np.unique(counts):
+        rows = np.flatnonzero(counts == k)
+        names = pd.DataFrame(artists[rng.choice(len(artists), (len(rows), k), p=popularity)])
+        credits[rows] = names[0].str.cat([names[i] for i in range(1, k)], sep=', ') if k > 1 else names[0]
+    return counts, credits
+
+
+def _with_thousands(values):
+    return pd.Series(values).map('{:,}'.format)
+
+
+def write_tracks(path, n_rows, seed=0):
+    """Write a track file with the ``spotify-2023.csv`` schema and quirks."""
+    rng = np.random.default_rng(seed)
+    n_artists = int(np.clip(n_rows // 3, 50, 500_000))
+    artists = np.array(['Artist %d' % i if i % 7 else 'Artiste %d Beyoncé' % i for i in range(n_artists)], dtype=object)
+    with open(path, 'w', newline='', encoding=SPOTIFY_ENCODING) as f:
+        for start in range(0, n_rows, CHUNK_ROWS):
+            rows = min(CHUNK_ROWS, n_rows - start)
+            counts, credits = _credits(rng, artists, rows)
+            year = np.where(rng.random(rows) < 0.8, rng.integers(2018, 2024, rows), rng.integers(1930, 2018, rows))
+            shazam = _with_thousands(rng.integers(0, 2_000, rows)).where(rng.random(rows) > 0.05)
+            frame = pd.DataFrame({
+                'track_name': ['Track %d' % i for i in range(start, start + rows)],
+                'artist(s)_name': credits,
+                'artist_count': counts,
+                'released_year': year,
+                'released_month': rng.integers(1, 13, rows),
+                'released_day': rng.integers(1, 29, rows),
+                'in_spotify_playlists': rng.integers(31, 53_000, rows),
+                'in_spotify_charts': rng.integers(0, 148, rows),
+                'streams': rng.integers(2_700, 3_700_000_000, rows).astype(object),
+                'in_apple_playlists': rng.integers(0, 673, rows),
+                'in_apple_charts': rng.integers(0, 276, rows),
+                'in_deezer_playlists': _with_thousands(rng.integers(0, 13_000, rows)),
+                'in_deezer_charts': rng.integers(0, 59, rows),
+                'in_shazam_charts': shazam,
+                'bpm': rng.integers(65, 207, rows),
+                'key': np.where(rng.random(rows) < 0.1, None, rng.choice(KEYS, rows)),
+                'mode': rng.choice(['Major', 'Minor'], rows),
+            })
+            for column, (low, high) in [('danceability_%', (23, 97)), ('valence_%', (4, 98)), ('energy_%', (9, 98)),
+                                        ('acousticness_%', (0, 98)), ('instrumentalness_%', (0, 92)),
+                                        ('liveness_%', (3, 98)), ('speechiness_%', (2, 65))]:
+                frame[column] = rng.integers(low, high, rows)
+            if start == 0:
+                frame.loc[0, 'streams'] = 'BPM110KeyAModeMajor'
+            frame.to_csv(f, header=start == 0, index=False)
+
+
+def dataset(kind, n_rows, n_assets=4, seed=0, directory=None):
+    """Path of a generated file, writing it on first use."""
+    directory = directory or os.path.join(BENCH_DIR, 'data')
+    os.makedirs(directory, exist_ok=True)
+    if kind == 'stock':
+        path = os.path.join(directory, 'prices-%d-%d-%d.csv' % (n_rows, n_assets, seed))
+    else:
+        path = os.path.join(directory, 'tracks-%d-%d.csv' % (n_rows, seed))
+    if not os.path.exists(path):
+        if kind == 'stock':
+            write_prices(path + '.tmp', n_rows, n_assets, seed)
+        else:
+            write_tracks(path + '.tmp', n_rows, seed)
+        os.replace(path + '.tmp', path)
+    return path
+
+
+# -- pipeline stages ------------------------------------------------------------
+
+def _render(fig):
+    import matplotlib.pyplot as plt
+
+    fig.savefig(io.BytesIO(), format='png', dpi=60)
+    plt.close(fig)
+
+
+def stock_load(state):
+    from portfolio_analytics import load_prices
+
+    state['prices'] = load_prices(state['path'])
+
+
+def stock_clean(state):
+    state['prices'] = state['prices'].ffill().dropna()
+
+
+def stock_returns(state):
+    from portfolio_analytics import daily_returns
+
+    state['returns'] = daily_returns(state['prices'])
+
+
+def stock_covariance(state):
+    from portfolio_analytics import estimate_inputs
+
+    state['mu'], state['S'] = estimate_inputs(state['prices'])
+
+
+def stock_frontier(state):
+    from frontier import sweep_frontier
+
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='Solution may be inaccurate')
+        state['frontier'] = sweep_frontier(state['mu'], state['S'], n_points=20, risk_free_rates=[0.02])
+
+
+def stock_render(state):
+    from stock_figures import normalized_prices_plot
+
+    # At most 20 assets are drawn; plotting thousands of lines measures matplotlib, not the pipeline
+    _render(normalized_prices_plot(state['prices'].iloc[:, :20]))
+
+
+def spotify_load(state):
+    # The malformed entry makes ``streams`` text, as in the real file
+    state['tracks'] = pd.read_csv(state['path'], encoding=SPOTIFY_ENCODING, dtype={'streams': str})
+
+
+def spotify_clean(state):
+    from release_dates import build_release_dates
+
+    tracks = state['tracks']
+    tracks['streams'] = pd.to_numeric(tracks['streams'], errors='coerce')
+    for column in ('in_deezer_playlists', 'in_shazam_charts'):
+        tracks[column] = pd.to_numeric(tracks[column].str.replace(',', '', regex=False), errors='coerce')
+    tracks['release_date'] = build_release_dates(tracks['released_year'], tracks['released_month'],
+                                                 tracks['released_day'])
+
+
+def spotify_groupbys(state):
+    from feature_stats import feature_stats
+    from release_dates import temporal_summary
+
+    tracks = state['tracks']
+    state['top_artists'] = tracks.groupby('artist(s)_name')['streams'].sum().nlargest(10)
+    state['yearly'] = temporal_summary(tracks, 'year', dates=tracks['release_date'])
+    state['feature_stats'] = feature_stats(tracks, ['danceability_%', 'valence_%', 'energy_%', 'acousticness_%',
+                                                    'liveness_%', 'speechiness_%'])
+
+
+def spotify_collaborations(state):
+    from collaborations import CollaborationGraph
+
+    state['pairs'] = CollaborationGraph.from_tracks(state['tracks']['artist(s)_name']).top_pairs(10)
+
+
+def spotify_render(state):
+    from spotify_figures import yearly_trends
+
+    _render(yearly_trends(state['tracks']))
+
+
+STAGES = {
+    'stock': [('load', stock_load), ('clean', stock_clean), ('returns', stock_returns),
+              ('covariance', stock_covariance), ('frontier', stock_frontier), ('render', stock_render)],
+    'spotify': [('load', spotify_load), ('clean', spotify_clean), ('groupbys', spotify_groupbys),
+                ('collaborations', spotify_collaborations), ('render', spotify_render)],
+}
+# Imported before timing so the first run of a stage does not pay for them
+MODULES = {
+    'stock': ['portfolio_analytics', 'frontier', 'stock_figures', 'pypfopt.expected_returns', 'pypfopt.risk_models',
+              'cvxpy', 'matplotlib.pyplot'],
+    'spotify': ['release_dates', 'feature_stats', 'collaborations', 'spotify_figures', 'seaborn', 'matplotlib.pyplot'],
+}
+
+
+# -- measurement -------------------------------------------------------------------
+
+def run_case(project, path, stages=None, repeat=3):
+    """Best wall time and peak traced allocation (MB) of every stage."""
+    import importlib
+
+    import matplotlib
+    matplotlib.use('Agg')
+    for module in MODULES[project]:
+        importlib.import_module(module)
+
+    selected = [(name, func) for name, func in STAGES[project] if not stages or name in stages]
+    if not selected:
+        return {}
+    # Stages need their predecessors' outputs, so unselected ones still run, untimed
+    pipeline = [(name, func, any(name == s for s, _ in selected)) for name, func in STAGES[project]]
+    last = max(i for i, (_, _, timed) in enumerate(pipeline) if timed)
+    pipeline = pipeline[:last + 1]
+
+    seconds = {}
+    for _ in range(repeat):
+        state = {'path': path}
+        for name, func, timed in pipeline:
+            start = time.perf_counter()
+            func(state)
+            if timed:
+                seconds[name] = min(seconds.get(name, np.inf), time.perf_counter() - start)
+
+    peaks = {}
+    state = {'path': path}
+    tracemalloc.start()
+    try:
+        for name, func, timed in pipeline:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            func(state)
+            if timed:
+                peaks[name] = (tracemalloc.get_traced_memory()[1] - before) / 1e6
+    finally:
+        tracemalloc.stop()
+    return {name: {'seconds': seconds[name], 'peak_mb': peaks[name]} for name, _ in selected}
+
+
+def cases(args):
+    if 'stock' in args.projects:
+        for rows in args.price_rows:
+            for assets in args.assets:
+                yield 'stock', 'rows=%d,assets=%d' % (rows, assets), ('stock', rows, assets)
+    if 'spotify' in args.projects:
+        for rows in args.track_rows:
+            yield 'spotify', 'rows=%d' % rows, ('spotify', rows, 4)
+
+
+def compare(results, baseline, tolerance=0.25, min_seconds=0.005, min_mb=1.0):
+    """Regressions of ``results`` against ``baseline`` as ``(key, metric, old, new)``.
+
+    Differences below ``min_seconds`` / ``min_mb`` are treated as noise."""
+    regressions = []
+    for key, result in results.items():
+        old = baseline.get(key)
+        if old is None:
+            continue
+        if result['seconds'] > old['seconds'] * (1 + tolerance) and result['seconds'] - old['seconds'] > min_seconds:
+            regressions.append((key, 'seconds', old['seconds'], result['seconds']))
+        if result['peak_mb'] > old['peak_mb'] * (1 + tolerance) and result['peak_mb'] - old['peak_mb'] > min_mb:
+            regressions.append((key, 'peak_mb', old['peak_mb'], result['peak_mb']))
+    return regressions
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark both pipelines on synthetic data.")
+    parser.add_argument('projects', nargs='*', metavar='project', help="stock, spotify (default: both)")
+    parser.add_argument('--price-rows', type=lambda v: int(float(v)), nargs='+', default=[1_383, 100_000])
+    parser.add_argument('--assets', type=int, nargs='+', default=[4, 100])
+    parser.add_argument('--track-rows', type=lambda v: int(float(v)), nargs='+', default=[1_000, 100_000])
+    parser.add_argument('--stages', help="comma-separated stage names to time (default: all)")
+    parser.add_argument('--repeat', type=int, default=3, help="timing runs per case; the best is kept")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=BASELINE, help="baseline JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run's results as the baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative slowdown / memory growth")
+    parser.add_argument('--output', '-o', help="also write the results as JSON to this file")
+    args = parser.parse_args(argv)
+    args.projects = args.projects or sorted(STAGES)
+    unknown = set(args.projects) - set(STAGES)
+    if unknown:
+        parser.error("unknown project(s): %s" % ', '.join(sorted(unknown)))
+    stages = args.stages.split(',') if args.stages else None
+    known = {name for project in args.projects for name, _ in STAGES[project]}
+    if stages and set(stages) - known:
+        parser.error("unknown stage(s) %s; the stages of %s are: %s"
+                     % (', '.join(sorted(set(stages) - known)), ', '.join(args.projects), ', '.join(sorted(known))))
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        baseline = {}
+
+    results = {}
+    skipped = set()
+    for project, label, (kind, rows, assets) in cases(args):
+        if stages and not any(name in stages for name, _ in STAGES[project]):
+            if project not in skipped:
+                print(f"{project}: no matching stages, skipped")
+                skipped.add(project)
+            continue
+        start = time.perf_counter()
+        path = dataset(kind, rows, assets, args.seed)
+        generated = time.perf_counter() - start
+        print(f"{project} {label}  ({os.path.getsize(path) / 1e6:,.1f} MB, generated/found in {generated:.1f}s)")
+        for stage, result in run_case(project, path, stages, args.repeat).items():
+            key = '%s/%s/%s' % (project, label, stage)
+            results[key] = result
+            old = baseline.get(key)
+            change = f"  {result['seconds'] / old['seconds'] - 1:+7.1%}" if old and old['seconds'] else ''
+            print(f"  {stage:<16} {result['seconds']:9.4f}s  {result['peak_mb']:10.1f} MB peak{change}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    regressions = compare(results, baseline, args.tolerance)
+    for key, metric, old, new in regressions:
+        print(f"REGRESSION {key} {metric}: {old:.4f} -> {new:.4f}")
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(dict(baseline, **results), f, indent=2, sort_keys=True)
+        print(f"baseline saved to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""Render the report figures of both analyses headless, in parallel, with caching.
+
+Each project folder has a figures module (``stock_figures.py``,
+``spotify_figures.py``) whose ``FIGURES`` map output names to pure plotting
+functions and their parameters. This script renders them with the Agg
+backend in a process pool and writes ``<name>.png`` into the project's
+``Visualizations/`` folder::
+
+    python render_figures.py                  # both projects
+    python render_figures.py spotify --processes 4
+    python render_figures.py stock --only efficient_frontier --force
+
+A figure is skipped when its cache key - a hash of the source data files, the
+source of the figures module and of every project module it imports
+(directly or through other project modules), and the figure's parameters -
+matches the one stored in
+``Visualizations/render_manifest.json`` and the PNG still exists. The
+manifest also records how long each figure took, and a timing table is
+printed after every run.
+"""
+
+import ast
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PROJECTS = {
+    'stock': ('Stock Analysis of BTC NYSE NASDAQ LSE', 'stock_figures'),
+    'spotify': ('Spotify 2023 Analysis', 'spotify_figures'),
+}
+MANIFEST = 'render_manifest.json'
+
+_data = {}
+
+
+def _figures_module(project):
+    folder, module = PROJECTS[project]
+    path = os.path.join(ROOT, folder)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+    return importlib.import_module(module)
+
+
+def _file_hash(path, digest):
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+
+def _imported_names(path):
+    with open(path, 'rb') as f:
+        tree = ast.parse(f.read(), path)
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            yield from (alias.name.split('.')[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            yield node.module.split('.')[0]
+
+
+def source_hash(project):
+    """Hash of the figures module and of the project modules it imports,
+    followed transitively, including imports inside functions."""
+    folder = os.path.join(ROOT, PROJECTS[project][0])
+    pending, seen = [PROJECTS[project][1]], set()
+    digest = hashlib.sha1()
+    while pending:
+        name = pending.pop()
+        path = os.path.join(folder, name + '.py')
+        if name in seen or not os.path.exists(path):
+            continue
+        seen.add(name)
+        pending.extend(_imported_names(path))
+    for name in sorted(seen):
+        digest.update(name.encode())
+        _file_hash(os.path.join(folder, name + '.py'), digest)
+    return digest.hexdigest()
+
+
+def figure_key(func, params, data_hash, code_hash=''):
+    """Cache key of one figure: data hash, code hash (see ``source_hash``),
+    function source and parameters."""
+    digest = hashlib.sha1(data_hash.encode())
+    digest.update(code_hash.encode())
+    digest.update(inspect.getsource(func).encode())
+    digest.update(json.dumps(params, sort_keys=True, default=repr).encode())
+    return digest.hexdigest()
+
+
+def _render(task):
+    project, name, path, dpi = task
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    module = _figures_module(project)
+    start = time.perf_counter()
+    if project not in _data:
+        _data[project] = module.load_data()
+    loaded = time.perf_counter()
+
+    func, params = module.FIGURES[name]
+    fig = func(_data[project], **params)
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+    return name, loaded - start, time.perf_counter() - loaded
+
+
+def render_project(project, processes=None, only=None, force=False, dpi=100):
+    """Render the changed figures of one project and return per-figure timings."""
+    module = _figures_module(project)
+    os.makedirs(module.OUTPUT_DIR, exist_ok=True)
+    manifest_path = os.path.join(module.OUTPUT_DIR, MANIFEST)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+
+    digest = hashlib.sha1()
+    for source in module.SOURCES:
+        _file_hash(source, digest)
+    data_hash = digest.hexdigest()
+    code_hash = source_hash(project)
+
+    tasks, keys, results = [], {}, []
+    for name, (func, params) in module.FIGURES.items():
+        if only and name not in only:
+            continue
+        path = os.path.join(module.OUTPUT_DIR, name + '.png')
+        keys[name] = figure_key(func, dict(params, dpi=dpi), data_hash, code_hash)
+        if not force and manifest.get(name, {}).get('key') == keys[name] and os.path.exists(path):
+            results.append((name, 'cached', 0.0, manifest[name].get('seconds', 0.0)))
+            continue
+        tasks.append((project, name, path, dpi))
+
+    if processes == 1 or len(tasks) <= 1:
+        rendered = [_render(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            rendered = list(pool.map(_render, tasks))
+    for name, load_seconds, seconds in rendered:
+        manifest[name] = {'key': keys[name], 'file': name + '.png', 'seconds': round(seconds, 4)}
+        results.append((name, 'rendered', load_seconds, seconds))
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return results
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Render report figures headless with caching.")
+    parser.add_argument('projects', nargs='*', metavar='project', help="%s (default: all)" % ', '.join(sorted(PROJECTS)))
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--only', action='append', help="render only this figure; repeatable")
+    parser.add_argument('--force', action='store_true', help="ignore the cache and render everything")
+    parser.add_argument('--dpi', type=int, default=100)
+    args = parser.parse_args(argv)
+    unknown = set(args.projects) - set(PROJECTS)
+    if unknown:
+        parser.error("unknown project(s): %s" % ', '.join(sorted(unknown)))
+
+    for project in args.projects or sorted(PROJECTS):
+        start = time.perf_counter()
+        results = render_project(project, args.processes, args.only, args.force, args.dpi)
+        print(f"{project}: {time.perf_counter() - start:.2f}s")
+        for name, status, load_seconds, seconds in sorted(results, key=lambda r: -r[3]):
+            note = f"(last render {seconds:.2f}s)" if status == 'cached' else f"{seconds:7.2f}s  load {load_seconds:.2f}s"
+            print(f"  {name:<28} {status:<9} {note}")
+
+
+if __name__ == '__main__':
+    main()
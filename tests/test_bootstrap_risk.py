@@ -0,0 +1,33 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from pypfopt import expected_returns, risk_models
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'Stock Analysis of BTC NYSE NASDAQ LSE'))
+
+from bootstrap_risk import block_bootstrap_counts, iter_resampled_inputs, resampled_inputs  # noqa: E402
+
+
+@pytest.mark.parametrize('n_assets', [4, 40])
+def test_resampled_inputs_match_pypfopt(n_assets):
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.0005, 0.01, size=(300, n_assets))
+    counts = block_bootstrap_counts(rng, len(returns), 5, block_length=10)
+    mu, S = resampled_inputs(returns, counts)
+    for b, c in enumerate(counts):
+        rows = pd.DataFrame(np.repeat(returns, c, axis=0))
+        np.testing.assert_allclose(mu[b], expected_returns.mean_historical_return(rows, returns_data=True),
+                                   rtol=1e-9)
+        np.testing.assert_allclose(S[b], risk_models.sample_cov(rows, returns_data=True), rtol=1e-9, atol=1e-15)
+
+
+def test_wide_universes_are_formed_one_resample_at_a_time():
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0.0005, 0.01, size=(100, 32))
+    counts = block_bootstrap_counts(rng, len(returns), 7)
+    batches = list(iter_resampled_inputs(returns, counts))
+    assert [S.shape for _, S in batches] == [(1, 32, 32)] * 7
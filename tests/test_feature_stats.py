@@ -0,0 +1,36 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Spotify 2023 Analysis'))
+
+from feature_stats import PERCENT_FEATURES, feature_stats  # noqa: E402
+from streaming_stats import DATA_FILE, ENCODING  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def tracks():
+    frame = pd.read_csv(DATA_FILE, encoding=ENCODING)
+    frame['streams'] = pd.to_numeric(frame['streams'], errors='coerce')
+    return frame
+
+
+@pytest.mark.parametrize('options', [{}, {'bin_range': (0, 100)}, {'chunk_rows': 300}])
+def test_histograms_match_numpy(tracks, options):
+    stats = feature_stats(tracks, **options)
+    for feature in PERCENT_FEATURES:
+        counts, edges = np.histogram(tracks[feature].dropna(), bins=30, range=options.get('bin_range'))
+        np.testing.assert_array_equal(stats.histograms[feature][0], counts, err_msg=feature)
+        np.testing.assert_array_equal(stats.histograms[feature][1], edges, err_msg=feature)
+
+
+def test_correlations_match_pandas(tracks):
+    stats = feature_stats(tracks, chunk_rows=300)
+    complete = tracks[['streams'] + PERCENT_FEATURES].dropna()
+    for feature in PERCENT_FEATURES:
+        np.testing.assert_allclose(stats.pearson[feature], complete['streams'].corr(complete[feature]), rtol=1e-10)
+        np.testing.assert_allclose(stats.spearman[feature],
+                                   complete['streams'].corr(complete[feature], method='spearman'), rtol=1e-10)
@@ -0,0 +1,27 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Spotify 2023 Analysis'))
+
+from ingest import ingest_spotify_csv  # noqa: E402
+from streaming_stats import DATA_FILE, ENCODING  # noqa: E402
+
+
+def test_quarantine_reports_file_lines_after_skipped_lines(tmp_path):
+    with open(DATA_FILE, encoding=ENCODING, newline='') as f:
+        lines = f.readlines()
+    malformed = lines[1].rstrip('\r\n') + ',x,y\n'
+    path = tmp_path / 'spotify.csv'
+    with open(path, 'w', encoding=ENCODING, newline='') as f:
+        f.writelines(lines[:10] + [malformed] + lines[10:300] + [malformed] + lines[300:])
+
+    quarantine = tmp_path / 'quarantine.jsonl'
+    frame, report = ingest_spotify_csv(str(path), chunksize=50, quarantine=str(quarantine))
+    assert report.malformed_lines == [11, 302]
+
+    records = [json.loads(line) for line in quarantine.read_text(encoding='utf-8').splitlines()]
+    assert sorted(r['line'] for r in records) == [11, 302, 578]
+    (coerced,) = [r for r in records if r['row'] is not None]
+    written = open(path, encoding=ENCODING, newline='').readlines()[coerced['line'] - 1]
+    assert written.startswith(frame.loc[coerced['row'], 'track_name'] + ',')
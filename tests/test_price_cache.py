@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'Stock Analysis of BTC NYSE NASDAQ LSE'))
+
+import price_cache  # noqa: E402
+from portfolio_analytics import DATA_FILE  # noqa: E402
+
+
+def test_same_named_sources_keep_their_own_cache(tmp_path, monkeypatch):
+    prices = pd.read_csv(DATA_FILE)
+    for folder, rows in (('a', len(prices)), ('b', 100)):
+        (tmp_path / folder).mkdir()
+        prices.iloc[:rows].to_csv(tmp_path / folder / 'prices.csv', index=False)
+    cache_dir = str(tmp_path / 'cache')
+
+    for folder in 'ab':
+        price_cache.load_price_frame(str(tmp_path / folder / 'prices.csv'), cache_dir=cache_dir)
+
+    def reparse(*args, **kwargs):
+        raise AssertionError("served from CSV instead of the cache")
+    monkeypatch.setattr(price_cache, 'read_price_csv', reparse)
+    assert len(price_cache.load_price_frame(str(tmp_path / 'a' / 'prices.csv'), cache_dir=cache_dir)) == len(prices)
+    assert len(price_cache.load_price_frame(str(tmp_path / 'b' / 'prices.csv'), cache_dir=cache_dir)) == 100
+
+
+def test_new_contents_replace_the_old_version(tmp_path):
+    path = tmp_path / 'prices.csv'
+    prices = pd.read_csv(DATA_FILE)
+    prices.to_csv(path, index=False)
+    price_cache.load_price_frame(str(path), verify='hash')
+    prices.iloc[:50].to_csv(path, index=False)
+    assert len(price_cache.load_price_frame(str(path), verify='hash')) == 50
+
+    (entry,) = os.listdir(tmp_path / '.price_cache')
+    assert len(os.listdir(tmp_path / '.price_cache' / entry)) == 1
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'Stock Analysis of BTC NYSE NASDAQ LSE'))
+
+from price_loader import (DATA_FILE, ConnectionPool, HTTPError, StandInServer, load_ticker_prices,  # noqa: E402
+                          split_wide_frame)
+
+
+@pytest.fixture(scope='module')
+def ticker_dir(tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp('tickers'))
+    split_wide_frame(DATA_FILE, directory)
+    return directory
+
+
+@pytest.fixture(scope='module')
+def bundled():
+    return pd.read_csv(DATA_FILE, index_col='Date', parse_dates=True)
+
+
+def test_split_files_reproduce_the_bundled_frame(ticker_dir, bundled):
+    tickers = [c for c in bundled.columns if not c.endswith('_Volume')]
+    wide = load_ticker_prices(tickers, [ticker_dir])
+    pd.testing.assert_frame_equal(wide, bundled[wide.columns], check_dtype=False)
+    assert sorted(wide.columns) == sorted(bundled.columns)
+
+
+def test_missing_local_file_falls_through(tmp_path, ticker_dir, bundled):
+    wide = load_ticker_prices(['BTC', 'LSE'], [str(tmp_path), ticker_dir])
+    pd.testing.assert_series_equal(wide['LSE'], bundled['LSE'], check_dtype=False)
+
+
+def test_http_404_falls_through(tmp_path, ticker_dir, bundled):
+    with StandInServer(str(tmp_path)) as empty, StandInServer(ticker_dir) as server:
+        wide = load_ticker_prices(['NYSE', 'NASDAQ'], [empty.url, server.url + '/{ticker}.csv'])
+    pd.testing.assert_frame_equal(wide, load_ticker_prices(['NYSE', 'NASDAQ'], [ticker_dir]))
+
+
+def test_missing_everywhere_names_the_ticker(tmp_path, ticker_dir):
+    with StandInServer(str(tmp_path)) as server:
+        with pytest.raises(FileNotFoundError, match=r"no source has NOPE \(searched .*%s" % server.url):
+            load_ticker_prices(['BTC', 'NOPE'], [ticker_dir, server.url])
+
+
+def test_keep_alive_connections_are_reused(ticker_dir):
+    async def fetch(url):
+        pool = ConnectionPool(per_host=2)
+        idle = pool._idle.setdefault(('127.0.0.1', int(url.rsplit(':', 1)[1]), False), [])
+        try:
+            bodies = [await pool.get(url + '/BTC.csv')]
+            (first,) = idle
+            bodies.append(await pool.get(url + '/NYSE.csv'))
+            (second,) = idle
+            # The stand-in server closes the connection after an error response
+            with pytest.raises(HTTPError) as missing:
+                await pool.get(url + '/NOPE.csv')
+            closed = list(idle)
+            bodies.append(await pool.get(url + '/BTC.csv'))
+            (third,) = idle
+            return bodies, first[1] is second[1], closed, third[1] is not first[1], missing.value.status
+        finally:
+            pool.close()
+
+    with StandInServer(ticker_dir) as server:
+        bodies, reused, closed, fresh, status = asyncio.run(fetch(server.url))
+    expected = []
+    for ticker in ('BTC', 'NYSE', 'BTC'):
+        with open(os.path.join(ticker_dir, ticker + '.csv'), 'rb') as f:
+            expected.append(f.read())
+    assert bodies == expected
+    assert reused and fresh
+    assert status == 404 and closed == []
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Spotify 2023 Analysis'))
+
+from ranking import RankingIndex  # noqa: E402
+from streaming_stats import DATA_FILE, ENCODING  # noqa: E402
+
+
+@pytest.fixture
+def tracks():
+    frame = pd.read_csv(DATA_FILE, encoding=ENCODING)
+    frame['streams'] = pd.to_numeric(frame['streams'], errors='coerce')
+    return frame
+
+
+def _expected_artists(frame, k=10):
+    return frame.groupby('artist(s)_name')['streams'].sum().nlargest(k)
+
+
+def test_repeated_rows_take_the_last_value(tracks):
+    index = RankingIndex(tracks)
+    row = tracks.index[1]
+    index.update([row, row], streams=[5e11, 1e12])
+    tracks.loc[row, 'streams'] = 1e12
+
+    top = index.top('artist_streams', 10)
+    np.testing.assert_allclose(top.to_numpy(), _expected_artists(tracks).to_numpy())
+    assert top.index[0] == tracks.loc[row, 'artist(s)_name']
+    assert index.frame.loc[row, 'streams'] == 1e12
+
+
+def test_random_updates_match_sorting(tracks):
+    index = RankingIndex(tracks, depth=16)
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        # Repeats included, as in the module's benchmark
+        rows = rng.choice(tracks.index, 30)
+        charts, streams = rng.integers(0, 150, 30), rng.integers(0, 2_000_000_000, 30).astype(float)
+        index.update(rows, in_spotify_charts=charts, streams=streams)
+        for row, chart, stream in zip(rows, charts, streams):
+            tracks.loc[row, ['in_spotify_charts', 'streams']] = [chart, stream]
+
+    total = tracks['in_spotify_playlists'] + tracks['in_spotify_charts']
+    np.testing.assert_array_equal(index.top('spotify_total', 10)['spotify_total'].to_numpy(),
+                                  total.nlargest(10).to_numpy())
+    np.testing.assert_allclose(index.top('artist_streams', 10).to_numpy(), _expected_artists(tracks).to_numpy())
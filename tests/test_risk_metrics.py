@@ -0,0 +1,55 @@
+import os
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'Stock Analysis of BTC NYSE NASDAQ LSE'))
+
+from risk_metrics import risk_metrics  # noqa: E402
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame(rng.standard_t(4, size=(400, 3)) * 0.01, columns=['BTC', 'NYSE', 'LSE'],
+                         index=pd.bdate_range('2018-01-02', periods=400))
+    frame.iloc[0] = np.nan
+    frame.iloc[100:105, 1] = np.nan
+    return frame
+
+
+def test_summary_and_rolling_match_pandas(returns):
+    metrics = risk_metrics(returns, windows=(21, 63))
+    summary = metrics.summary
+    np.testing.assert_allclose(summary['volatility'], returns.std() * np.sqrt(252), rtol=1e-10)
+    np.testing.assert_allclose(summary['annual_return'], returns.mean() * 252, rtol=1e-10)
+    np.testing.assert_allclose(summary['var_95'], -returns.quantile(0.05), rtol=1e-10)
+    wealth = (1 + returns.fillna(0)).cumprod()
+    np.testing.assert_allclose(summary['max_drawdown'], -(wealth / wealth.cummax() - 1).min(), rtol=1e-10)
+    benchmark = returns.mean(axis=1)
+    for window in (21, 63):
+        np.testing.assert_allclose(metrics.rolling['volatility', window],
+                                   returns.rolling(window).std() * np.sqrt(252), rtol=1e-8)
+        np.testing.assert_allclose(metrics.rolling['correlation', window],
+                                   returns.rolling(window).corr(benchmark), rtol=1e-8, atol=1e-12)
+
+
+def test_columns_without_enough_returns_are_nan(returns):
+    returns['NYSE'] = np.nan
+    returns.loc[returns.index[2:], 'LSE'] = np.nan
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        summary = risk_metrics(returns, windows=(21,)).summary
+
+    assert summary.loc['NYSE', 'days'] == 0 and summary.loc['LSE', 'days'] == 1
+    for column in ('volatility', 'sharpe', 'sortino'):
+        assert summary.loc[['NYSE', 'LSE'], column].isna().all(), column
+    for column in ('annual_return', 'max_drawdown', 'max_drawdown_days', 'current_drawdown', 'drawdown_peak',
+                   'drawdown_trough', 'var_95', 'cvar_95', 'var_99', 'cvar_99'):
+        assert pd.isna(summary.loc['NYSE', column]), column
+    np.testing.assert_allclose(summary.loc['LSE', 'var_95'], -returns['LSE'].quantile(0.05))
+    assert summary.loc['BTC'].notna().drop('drawdown_recovery').all()
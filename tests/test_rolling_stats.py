@@ -0,0 +1,133 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'Stock Analysis of BTC NYSE NASDAQ LSE'))
+
+from rolling_stats import EWMMoments, IncrementalPriceStats, RollingMoments, RunningMoments  # noqa: E402
+
+N_ASSETS = 4
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(rng.normal(0.0005, 0.02, size=(300, N_ASSETS)), columns=['BTC', 'NYSE', 'NASDAQ', 'LSE'])
+
+
+@pytest.fixture
+def prices(returns):
+    return 100 * (1 + returns).cumprod()
+
+
+def _feed(moments, frame):
+    for row in frame.to_numpy():
+        moments.update(row)
+    return moments
+
+
+def test_running_moments_match_full_history(returns):
+    moments = _feed(RunningMoments(N_ASSETS), returns)
+    np.testing.assert_allclose(moments.mean, returns.mean(), rtol=1e-12)
+    np.testing.assert_allclose(moments.cov(), returns.cov(), rtol=1e-10)
+    np.testing.assert_allclose(moments.std(), returns.std(), rtol=1e-10)
+    np.testing.assert_allclose(moments.corr(), returns.corr(), rtol=1e-10)
+
+
+def test_batch_merges_match_single_pass(returns):
+    single = _feed(RunningMoments(N_ASSETS), returns)
+    merged = RunningMoments(N_ASSETS)
+    bounds = [0, 7, 100, 101, 250, len(returns)]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        merged.update_batch(returns.iloc[start:end].to_numpy())
+    assert merged.count == single.count
+    np.testing.assert_allclose(merged.mean, single.mean, rtol=1e-12)
+    np.testing.assert_allclose(merged.cov(), single.cov(), rtol=1e-10)
+
+
+def test_nan_rows_are_skipped(returns):
+    gappy = returns.copy()
+    gappy.iloc[[3, 50, 51, 52, 199], [0, 2, 1, 3, 0]] = np.nan
+    complete = gappy.dropna()
+
+    moments = _feed(RunningMoments(N_ASSETS), gappy)
+    batch = RunningMoments(N_ASSETS)
+    batch.update_batch(gappy.to_numpy())
+    assert moments.count == batch.count == len(complete)
+    np.testing.assert_allclose(moments.cov(), complete.cov(), rtol=1e-10)
+    np.testing.assert_allclose(batch.cov(), complete.cov(), rtol=1e-10)
+
+    window = 20
+    rolling = _feed(RollingMoments(N_ASSETS, window), gappy)
+    np.testing.assert_allclose(rolling.mean, complete.iloc[-window:].mean(), rtol=1e-10)
+    np.testing.assert_allclose(rolling.cov(), complete.iloc[-window:].cov(), rtol=1e-9)
+
+
+@pytest.mark.parametrize('window', [1, 2, 20, 60])
+def test_rolling_moments_match_pandas_rolling(returns, window):
+    expected_mean = returns.rolling(window).mean()
+    expected_std = returns.rolling(window).std()
+    moments = RollingMoments(N_ASSETS, window)
+    # Long enough to cross several buffer rebuilds
+    for i, row in enumerate(returns.to_numpy()):
+        moments.update(row)
+        if i + 1 < window:
+            assert np.isnan(moments.cov()).all()
+            continue
+        np.testing.assert_allclose(moments.mean, expected_mean.iloc[i], rtol=1e-9, atol=1e-15)
+        if window > 1:
+            np.testing.assert_allclose(moments.std(), expected_std.iloc[i], rtol=1e-9)
+
+
+def test_rolling_window_boundary(returns):
+    window = 20
+    moments = _feed(RollingMoments(N_ASSETS, window), returns.iloc[:window - 1])
+    assert np.isnan(moments.cov()).all()
+    moments.update(returns.iloc[window - 1].to_numpy())
+    np.testing.assert_allclose(moments.cov(), returns.iloc[:window].cov(), rtol=1e-10)
+    moments.update(returns.iloc[window].to_numpy())
+    assert moments.count == window
+    np.testing.assert_allclose(moments.cov(), returns.iloc[1:window + 1].cov(), rtol=1e-10)
+
+
+@pytest.mark.parametrize('adjust', [True, False])
+def test_ewm_moments_match_pandas_ewm(returns, adjust):
+    span = 30
+    moments = _feed(EWMMoments(N_ASSETS, span=span, adjust=adjust), returns)
+    ewm = returns.ewm(span=span, adjust=adjust)
+    np.testing.assert_allclose(moments.mean, ewm.mean().iloc[-1], rtol=1e-10)
+    np.testing.assert_allclose(moments.cov(), ewm.cov().iloc[-N_ASSETS:].droplevel(0), rtol=1e-9)
+    np.testing.assert_allclose(moments.std(), ewm.std().iloc[-1], rtol=1e-9)
+
+
+def test_ewm_parameters_are_validated():
+    with pytest.raises(ValueError):
+        EWMMoments(N_ASSETS)
+    with pytest.raises(ValueError):
+        EWMMoments(N_ASSETS, span=10, alpha=0.1)
+    with pytest.raises(ValueError):
+        EWMMoments(N_ASSETS, alpha=1.5)
+
+
+def test_price_stats_incremental_appends_match_batch(prices):
+    window, span = 60, 30
+    stats = IncrementalPriceStats(prices.columns, window=window, ewm_span=span)
+    stats.append(prices.iloc[:200])
+    for _, row in prices.iloc[200:250].iterrows():
+        stats.append(row)
+    stats.append(prices.iloc[250:])
+
+    returns = prices.pct_change()
+    np.testing.assert_allclose(stats.price_corr(), prices.corr(), rtol=1e-10)
+    np.testing.assert_allclose(stats.returns_mean(), returns.mean(), rtol=1e-10)
+    np.testing.assert_allclose(stats.returns_std(), returns.std(), rtol=1e-10)
+    np.testing.assert_allclose(stats.sample_cov(), returns.cov() * 252, rtol=1e-10)
+    np.testing.assert_allclose(stats.rolling_cov(), returns.rolling(window).cov().iloc[-N_ASSETS:].droplevel(0),
+                               rtol=1e-9)
+    np.testing.assert_allclose(stats.ewm_cov(), returns.ewm(span=span).cov().iloc[-N_ASSETS:].droplevel(0),
+                               rtol=1e-9)
+    assert list(stats.returns_std().index) == list(prices.columns)
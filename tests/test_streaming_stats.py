@@ -0,0 +1,25 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Spotify 2023 Analysis'))
+
+from streaming_stats import DATA_FILE, ENCODING, TrackAggregate  # noqa: E402
+
+
+def test_top_songs_skip_missing_playlist_counts():
+    data = pd.read_csv(DATA_FILE, encoding=ENCODING)
+    top = data['in_spotify_playlists'].nlargest(3).index
+    data.loc[top[[0, 2]], 'in_spotify_playlists'] = np.nan
+
+    aggregate = TrackAggregate(top_n=10)
+    # Chunks smaller than top_n, so every row of a chunk is a candidate
+    for start in range(0, len(data), 7):
+        aggregate.update(data.iloc[start:start + 7], first_row=start)
+
+    expected = data.nlargest(10, 'in_spotify_playlists')
+    result = aggregate.top_songs_in_playlists()
+    assert list(result['track_name']) == list(expected['track_name'])
+    np.testing.assert_array_equal(result['in_spotify_playlists'], expected['in_spotify_playlists'])
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""Per-stage instrumentation of the two analysis scripts.
+
+The scripts are notebook exports: markdown cells are bare string literals
+and every ``# N. Title`` heading starts a new section. This runner splits a
+script at those headings and executes the sections one by one in a shared
+namespace, exactly as the notebook would. Each section is one stage, and for
+each stage it records:
+
+- wall and CPU time,
+- rows: the length of the largest DataFrame, Series or array the stage
+  created or rebound,
+- peak traced allocation (``tracemalloc``) and the process RSS high-water
+  mark afterwards,
+- copies: deep copies of pandas data (``BlockManager.copy(deep=True)``).
+
+One JSON line per stage is appended to ``--trace`` with a run id, so traces
+of nightly runs can be concatenated and compared with ``--summarize``.
+``--folded`` writes the flamegraph "folded stacks" format
+(``pipeline;stage;frame;... weight``). Without profiling each stage is a
+single frame weighted by its wall time in microseconds. ``--profile sample``
+samples the stack every ``--interval`` seconds, and ``--profile cprofile``
+saves a ``.prof`` per stage and puts the top functions into the JSON record::
+
+    python trace_pipeline.py spotify --trace traces.jsonl --folded spotify.folded
+    python trace_pipeline.py stock --profile sample --folded stock.folded
+    python trace_pipeline.py --summarize traces.jsonl
+
+``StageTracer`` can also be used directly with ``with tracer.stage(name):``.
+"""
+
+import ast
+import contextlib
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+import uuid
+from collections import Counter
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PIPELINES = {
+    # name: (folder, script, working directory relative to the folder)
+    'stock': ('Stock Analysis of BTC NYSE NASDAQ LSE', 'stock_analysis_of_btc_nyse_nasdaq.py', '.'),
+    'spotify': ('Spotify 2023 Analysis', 'spotify_2023_analysis.py', 'data'),
+}
+
+
+class _CopyCounter:
+    """Counts deep copies of pandas block managers while installed."""
+
+    def __init__(self):
+        self.count = 0
+        self._original = None
+
+    def install(self):
+        try:
+            from pandas.core.internals.managers import BaseBlockManager
+        except ImportError:
+            return False
+        original = self._original = BaseBlockManager.copy
+        counter = self
+
+        def copy(manager, *args, **kwargs):
+            deep = kwargs.get('deep', args[0] if args else True)
+            if deep:
+                counter.count += 1
+            return original(manager, *args, **kwargs)
+
+        BaseBlockManager.copy = copy
+        return True
+
+    def uninstall(self):
+        if self._original is not None:
+            from pandas.core.internals.managers import BaseBlockManager
+
+            BaseBlockManager.copy = self._original
+            self._original = None
+
+
+class _StackSampler(threading.Thread):
+    """Samples one thread's stack below ``skip`` frames into folded stacks."""
+
+    def __init__(self, thread_id, skip, prefix, interval, stacks):
+        super().__init__(daemon=True)
+        self.thread_id, self.skip, self.prefix = thread_id, skip, prefix
+        self.interval, self.stacks = interval, stacks
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno))
+                frame = frame.f_back
+            names = names[::-1][self.skip:]
+            self.stacks[';'.join(self.prefix + names)] += 1
+
+
+def _max_rss_mb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == 'darwin' else rss / 1e3
+
+
+def _stack_depth(frame):
+    depth = 0
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back
+    return depth
+
+
+class StageTracer:
+    """Collects one record per stage; see the module docstring.
+
+    ``profile`` is ``None``, ``'cprofile'`` or ``'sample'``. With
+    ``'cprofile'`` the per-stage statistics go to ``profile_dir``.
+    """
+
+    def __init__(self, pipeline, memory=True, profile=None, interval=0.005, profile_dir=None, run_id=None):
+        self.pipeline = pipeline
+        self.memory = memory
+        self.profile = profile
+        self.interval = interval
+        self.profile_dir = profile_dir
+        self.run_id = run_id or '%s-%s' % (time.strftime('%Y%m%dT%H%M%S'), uuid.uuid4().hex[:6])
+        self.records = []
+        self.stacks = Counter()
+        self._copies = _CopyCounter()
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        """Measure the ``with`` body; the yielded record's ``rows`` may be set by the caller."""
+        record = {'run_id': self.run_id, 'pipeline': self.pipeline, 'stage': name, 'index': len(self.records),
+                  'start': time.strftime('%Y-%m-%dT%H:%M:%S'), 'rows': rows}
+        counting = self._copies.install()
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.memory:
+            tracemalloc.reset_peak()
+            traced_before = tracemalloc.get_traced_memory()[0]
+
+        profiler = sampler = None
+        if self.profile == 'cprofile':
+            profiler = cProfile.Profile()
+        elif self.profile == 'sample':
+            # Frames up to the caller's are the runner's, not the stage's
+            skip = _stack_depth(sys._getframe(2))
+            sampler = _StackSampler(threading.get_ident(), skip, [self.pipeline, name], self.interval, self.stacks)
+            sampler.start()
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+            record['status'] = 'ok'
+        except BaseException as exc:
+            record['status'] = 'error'
+            record['error'] = '%s: %s' % (type(exc).__name__, exc)
+            record['traceback'] = traceback.format_exc()
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+            record['wall_s'] = time.perf_counter() - wall
+            record['cpu_s'] = time.process_time() - cpu
+            if sampler:
+                sampler.done.set()
+                sampler.join()
+            else:
+                self.stacks[';'.join([self.pipeline, name])] += max(1, int(record['wall_s'] * 1e6))
+            if self.memory:
+                record['peak_mb'] = (tracemalloc.get_traced_memory()[1] - traced_before) / 1e6
+                if tracing:
+                    tracemalloc.stop()
+            record['max_rss_mb'] = _max_rss_mb()
+            record['copies'] = self._copies.count if counting else None
+            self._copies.count = 0
+            self._copies.uninstall()
+            if profiler:
+                self._save_profile(profiler, record)
+            self.records.append(record)
+
+    def _save_profile(self, profiler, record, top=15):
+        stats = pstats.Stats(profiler, stream=io.StringIO())
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            safe = ''.join(c if c.isalnum() else '_' for c in record['stage']).strip('_')
+            record['profile'] = os.path.join(self.profile_dir, '%s-%02d-%s.prof' % (
+                self.pipeline, record['index'], safe))
+            stats.dump_stats(record['profile'])
+        rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:top]
+        record['top_functions'] = [
+            {'function': '%s (%s:%d)' % (func, os.path.basename(path), line), 'calls': calls,
+             'tottime': round(tottime, 6), 'cumtime': round(cumtime, 6)}
+            for (path, line, func), (_, calls, tottime, cumtime, _) in rows]
+
+    def write(self, trace=None, folded=None):
+        """Append the records as JSON lines to ``trace`` and write ``folded`` stacks."""
+        if trace:
+            with open(trace, 'a') as f:
+                for record in self.records:
+                    f.write(json.dumps(record, default=str) + '\n')
+        if folded:
+            with open(folded, 'w') as f:
+                for stack, weight in sorted(self.stacks.items()):
+                    f.write('%s %d\n' % (stack, weight))
+
+
+# -- running the scripts -------------------------------------------------------------
+
+def _heading(node):
+    if not (isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)):
+        return None
+    headings = [line.lstrip('#').strip() for line in node.value.value.splitlines() if line.startswith('#')]
+    return headings[-1] if headings else None
+
+
+def script_stages(path):
+    """``(name, code)`` per notebook section of a script, in order."""
+    with open(path, encoding='utf-8') as f:
+        tree = ast.parse(f.read(), path)
+    stages, name, body = [], 'setup', []
+    for node in tree.body:
+        heading = _heading(node)
+        if heading is not None:
+            if body:
+                stages.append((name, body))
+            name, body = heading, []
+        else:
+            body.append(node)
+    if body:
+        stages.append((name, body))
+    return [(name, compile(ast.Module(body=body, type_ignores=[]), path, 'exec')) for name, body in stages]
+
+
+def _rows(value):
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)) and getattr(value, 'ndim', 1) > 0:
+        return len(value)
+    return None
+
+
+def run_script(pipeline, tracer, keep_going=False, show_output=False):
+    """Execute one script stage by stage under ``tracer``; returns False if a stage failed."""
+    import warnings
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    folder, script, workdir = PIPELINES[pipeline]
+    folder = os.path.join(ROOT, folder)
+    path = os.path.join(folder, script)
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    namespace = {'__name__': '__main__', '__file__': path}
+    previous_dir = os.getcwd()
+    os.chdir(os.path.join(folder, workdir))
+    ok = True
+    try:
+        for name, code in script_stages(path):
+            before = {k: id(v) for k, v in namespace.items()}
+            output = contextlib.nullcontext() if show_output else contextlib.redirect_stdout(io.StringIO())
+            try:
+                with tracer.stage(name) as record, output, warnings.catch_warnings():
+                    warnings.filterwarnings('ignore', message='.*non-interactive.*')
+                    exec(code, namespace)
+                    changed = [_rows(v) for k, v in namespace.items() if before.get(k) != id(v)]
+                    record['rows'] = max([r for r in changed if r is not None], default=None)
+            except Exception:
+                ok = False
+                print(f"{pipeline}: stage {name!r} failed\n{tracer.records[-1]['traceback']}", file=sys.stderr)
+                if not keep_going:
+                    break
+    finally:
+        os.chdir(previous_dir)
+    return ok
+
+
+def summarize(paths):
+    """Median wall/CPU time and peak memory per stage across the runs in trace files."""
+    import pandas as pd
+
+    records = []
+    for path in paths:
+        with open(path) as f:
+            records += [json.loads(line) for line in f if line.strip()]
+    frame = pd.DataFrame(records)
+    grouped = frame.groupby(['pipeline', 'index', 'stage'], sort=True)
+    summary = grouped[['wall_s', 'cpu_s', 'peak_mb', 'copies']].median()
+    summary.insert(0, 'runs', grouped['run_id'].nunique())
+    summary['last_wall_s'] = grouped['wall_s'].last()
+    return summary.droplevel('index')
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the analysis scripts stage by stage with instrumentation.")
+    parser.add_argument('pipelines', nargs='*', metavar='pipeline', help="%s (default: all)" % ', '.join(sorted(PIPELINES)))
+    parser.add_argument('--trace', default='-', help="append JSON lines here (default: stdout)")
+    parser.add_argument('--folded', help="write flamegraph folded stacks to this file")
+    parser.add_argument('--profile', choices=['cprofile', 'sample'], help="profile each stage")
+    parser.add_argument('--interval', type=float, default=0.005, help="seconds between stack samples")
+    parser.add_argument('--profile-dir', help="where --profile cprofile saves the .prof files")
+    parser.add_argument('--no-memory', action='store_true', help="skip tracemalloc (lower overhead)")
+    parser.add_argument('--keep-going', action='store_true', help="continue after a failing stage")
+    parser.add_argument('--show-output', action='store_true', help="let the scripts print")
+    parser.add_argument('--summarize', nargs='+', metavar='TRACE', help="summarise existing trace files and exit")
+    args = parser.parse_args(argv)
+
+    if args.summarize:
+        import pandas as pd
+
+        with pd.option_context('display.width', 200, 'display.max_rows', None, 'display.max_columns', None):
+            print(summarize(args.summarize))
+        return 0
+    unknown = set(args.pipelines) - set(PIPELINES)
+    if unknown:
+        parser.error("unknown pipeline(s): %s" % ', '.join(sorted(unknown)))
+
+    failed = False
+    stacks = Counter()
+    for pipeline in args.pipelines or sorted(PIPELINES):
+        tracer = StageTracer(pipeline, memory=not args.no_memory, profile=args.profile, interval=args.interval,
+                             profile_dir=args.profile_dir)
+        failed |= not run_script(pipeline, tracer, args.keep_going, args.show_output)
+        if args.trace == '-':
+            for record in tracer.records:
+                print(json.dumps({k: v for k, v in record.items() if k != 'traceback'}, default=str))
+        else:
+            tracer.write(args.trace)
+        stacks.update(tracer.stacks)
+    if args.folded:
+        with open(args.folded, 'w') as f:
+            for stack, weight in sorted(stacks.items()):
+                f.write('%s %d\n' % (stack, weight))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())